@@ -1,9 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from rag_module import get_context_from_query
-from llm_module import get_llm_response
+from rag_module import get_contexts_for_queries, get_retriever, retrieval_cache
+from cache_module import normalize_query
+from llm_module import response_cache, semantic_cache, llm_flight, llm_scheduler, stream_llm_answer
+from scheduler_module import BATCH, parse_priority
+from pipeline_module import (
+    ANSWER_STAGES, LLM_STAGES, NO_CONTEXT, ChatTurn, classify, run_pipeline, validate
+)
+from metrics_module import PROMETHEUS_CONTENT_TYPE, registry, request_seconds, requests_total, stage_seconds
+from static_module import DEFAULT_CACHE_CONTROL, StaticAsset
+from concurrent.futures import Future, ThreadPoolExecutor
+import json
 import logging
 import os
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,14 +22,44 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
+# Batch requests: at most BATCH_MAX_QUERIES per call, LLM calls run on a shared
+# pool of BATCH_PARALLELISM threads
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "4"))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_PARALLELISM, thread_name_prefix="chat-batch")
+
+# Load the keyword database once at startup; it is hot-reloaded when it changes
+get_retriever().snapshot()
+
+# Chat endpoints are counted and timed (until the response, or the first streamed byte, is ready)
+CHAT_ENDPOINTS = {'chat', 'chat_stream', 'chat_batch'}
+
+@app.before_request
+def start_request_timer():
+    if request.endpoint in CHAT_ENDPOINTS:
+        requests_total.inc(endpoint=request.endpoint)
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        request_seconds.observe(time.perf_counter() - started, endpoint=request.endpoint)
+    return response
+
+# The UI is read and compressed once, then served from memory; edits to the file are picked up
+ui_page = StaticAsset('index.html', 'text/html; charset=utf-8',
+                      cache_control=os.getenv("UI_CACHE_CONTROL", DEFAULT_CACHE_CONTROL))
+ui_page.current()
+
 # Add a route to serve the UI
 @app.route('/')
 def home():
     """Serve the chatbot UI"""
-    ui_file = 'index.html'
-    if os.path.exists(ui_file):
-        with open(ui_file, 'r', encoding='utf-8') as f:
-            return f.read()
+    page = ui_page.respond(request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+    if page:
+        status, body, headers = page
+        return Response(body, status=status, headers=headers)
     else:
         return """
         <h1>🌾 Crop Recommendation API</h1>
@@ -27,38 +67,43 @@ def home():
         <p>Available endpoints:</p>
         <ul>
             <li><code>POST /chat</code> - Send queries to the chatbot</li>
+            <li><code>POST /chat/stream</code> - Stream the answer as Server-Sent Events</li>
+            <li><code>POST /chat/batch</code> - Answer a list of queries in one call</li>
             <li><code>GET /health</code> - Check API health</li>
+            <li><code>GET /metrics</code> - Prometheus metrics</li>
         </ul>
         """
 
+def get_query_from_request():
+    """Return (query, None) for a valid chat request, or (None, error response)"""
+    if not request.json:
+        return None, (jsonify({"error": "Request must be JSON"}), 400)
+        
+    user_query = request.json.get("query")
+    if not user_query:
+        return None, (jsonify({"error": "Query is required"}), 400)
+    
+    if not user_query.strip():
+        return None, (jsonify({"error": "Query cannot be empty"}), 400)
+    
+    return user_query, None
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
         # Validate request
-        if not request.json:
-            return jsonify({"error": "Request must be JSON"}), 400
-            
-        user_query = request.json.get("query")
-        if not user_query:
-            return jsonify({"error": "Query is required"}), 400
-        
-        if not user_query.strip():
-            return jsonify({"error": "Query cannot be empty"}), 400
+        user_query, error_response = get_query_from_request()
+        if error_response:
+            return error_response
 
         logger.info(f"Processing query: {user_query}")
 
-        # Step 1: Retrieve context from vector database
-        context = get_context_from_query(user_query)
-        
-        if not context:
-            logger.warning("No relevant context found for query")
-            context = "No specific crop data found. Please provide general farming guidance."
-
-        # Step 2: Get LLM response using context + query
-        response = get_llm_response(user_query, context)
+        # validate -> classify -> retrieve -> prompt -> generate; invalid, off-topic,
+        # table and cached answers return before the later (costlier) stages run
+        turn = run_pipeline(ChatTurn(user_query, parse_priority(request.json.get("priority"))))
 
         return jsonify({
-            "response": response,
+            "response": turn.reply,
             "status": "success"
         })
 
@@ -69,9 +114,125 @@ def chat():
             "status": "error"
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the answer as Server-Sent Events: `data: {"delta": "<html>"}` chunks, then `event: done`"""
+    try:
+        user_query, error_response = get_query_from_request()
+        if error_response:
+            return error_response
+
+        logger.info(f"Streaming query: {user_query}")
+
+        # Everything up to the LLM call runs before the response starts
+        turn = run_pipeline(ChatTurn(user_query, parse_priority(request.json.get("priority"))), ANSWER_STAGES)
+
+        def generate():
+            if turn.reply is not None:
+                chunks = [turn.reply]
+            else:
+                chunks = stream_llm_answer(turn.llm_request)
+            for chunk in chunks:
+                yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return jsonify({
+            "error": "An error occurred while processing your request",
+            "status": "error"
+        }), 500
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer a list of queries; results are returned in order with a status per item"""
+    try:
+        if not request.json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        
+        queries = request.json.get("queries")
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "queries must be a non-empty list"}), 400
+        
+        if len(queries) > BATCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}), 400
+        
+        results = [None] * len(queries)
+        
+        # Identical questions (after normalization) are answered once
+        unique = {}
+        for i, query in enumerate(queries):
+            if not isinstance(query, str):
+                results[i] = {"query": query, "status": "error", "error": "Query must be a string"}
+                continue
+            if not query.strip():
+                results[i] = {"query": query, "status": "error", "error": "Query cannot be empty"}
+                continue
+            unique.setdefault(normalize_query(query), []).append(i)
+        
+        logger.info(f"Processing batch of {len(queries)} queries ({len(unique)} unique)")
+        
+        # Batch calls queue behind interactive chats for the LLM
+        turns = [ChatTurn(queries[indexes[0]], BATCH) for indexes in unique.values()]
+        futures = [None] * len(turns)
+        
+        # Invalid, off-topic and table lookups are answered right away; the rest
+        # share one retrieval pass, then build prompts and call the LLM on the pool
+        for n, turn in enumerate(turns):
+            if run_pipeline(turn, (validate, classify)).reply is not None:
+                futures[n] = Future()
+                futures[n].set_result(turn)
+        pending = [n for n, future in enumerate(futures) if future is None]
+        with stage_seconds.time(stage="retrieval"):
+            contexts = get_contexts_for_queries([turns[n].query for n in pending])
+        
+        for n, context in zip(pending, contexts):
+            turns[n].context = context or NO_CONTEXT
+            futures[n] = batch_executor.submit(run_pipeline, turns[n], LLM_STAGES)
+        
+        for indexes, future in zip(unique.values(), futures):
+            try:
+                item = {"status": "success", "response": future.result().reply}
+            except Exception as e:
+                logger.error(f"Error processing batch item: {str(e)}")
+                item = {"status": "error", "error": "An error occurred while processing this query"}
+            for i in indexes:
+                results[i] = dict(item, query=queries[i])
+        
+        return jsonify({
+            "results": results,
+            "status": "success"
+        })
+
+    except Exception as e:
+        logger.error(f"Error processing batch request: {str(e)}")
+        return jsonify({
+            "error": "An error occurred while processing your request",
+            "status": "error"
+        }), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "message": "Crop recommendation API is running"})
+    return jsonify({
+        "status": "healthy",
+        "message": "Crop recommendation API is running",
+        "retrieval_cache": retrieval_cache.stats() if retrieval_cache else None,
+        "response_cache": response_cache.stats() if response_cache else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "coalescing": llm_flight.stats(),
+        "scheduler": llm_scheduler.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: per-stage latency histograms and request, cache, error and token counters"""
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     print("🌾 Starting Crop Recommendation Chatbot...")
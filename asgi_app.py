@@ -0,0 +1,89 @@
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse
+
+from app import app as flask_app, llm_scheduler, response_cache, semantic_cache
+from rag_module import retrieval_cache
+from metrics_module import request_seconds, requests_total
+from pipeline_module import ANSWER_STAGES, ChatTurn, run_pipeline
+from scheduler_module import parse_priority
+from async_module import (
+    async_llm_flight,
+    close_async_llm_client,
+    generate_llm_answer_async,
+    get_async_llm_client,
+)
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app):
+    get_async_llm_client()
+    yield
+    await close_async_llm_client()
+
+# Async entry point: /chat and /health are served natively on the event loop, so
+# slow LLM calls don't pin worker threads. Everything else (UI, /chat/stream, /metrics) is
+# handled by the Flask app. Run with: uvicorn asgi_app:app --port 5000
+app = FastAPI(title="Crop Recommendation API", lifespan=lifespan)
+
+@app.post("/chat")
+async def chat(request: Request):
+    requests_total.inc(endpoint="chat")
+    started = time.perf_counter()
+    try:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if not body or not isinstance(body, dict):
+            return JSONResponse({"error": "Request must be JSON"}, status_code=400)
+
+        user_query = body.get("query")
+        if not user_query:
+            return JSONResponse({"error": "Query is required"}, status_code=400)
+
+        if not user_query.strip():
+            return JSONResponse({"error": "Query cannot be empty"}, status_code=400)
+
+        logger.info(f"Processing async query: {user_query}")
+
+        # Crop table lookups and retrieval may reload the index from disk and prompt
+        # building may embed the query for the semantic cache, so these stages run off
+        # the event loop
+        turn = ChatTurn(user_query, parse_priority(body.get("priority")))
+        await asyncio.to_thread(run_pipeline, turn, ANSWER_STAGES)
+        if turn.reply is None:
+            turn.reply = await generate_llm_answer_async(turn.llm_request)
+
+        return {"response": turn.reply, "status": "success"}
+
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return JSONResponse({
+            "error": "An error occurred while processing your request",
+            "status": "error"
+        }, status_code=500)
+
+    finally:
+        request_seconds.observe(time.perf_counter() - started, endpoint="chat")
+
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "message": "Crop recommendation API is running",
+        "retrieval_cache": retrieval_cache.stats() if retrieval_cache else None,
+        "response_cache": response_cache.stats() if response_cache else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "upstream": get_async_llm_client().stats(),
+        "coalescing": async_llm_flight.stats(),
+        "scheduler": llm_scheduler.stats()
+    }
+
+app.mount("/", WSGIMiddleware(flask_app))
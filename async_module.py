@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+import requests
+
+from coalesce_module import AsyncSingleFlight
+from client_module import RETRY_STATUSES, CircuitBreaker, CircuitOpenError, backoff_delay, parse_retry_after
+from llm_module import (
+    GROQ_API_KEY,
+    GROQ_BASE_URL,
+    complete_llm_response,
+    create_engagement_footer,
+    format_response_for_html,
+    llm_scheduler,
+    request_error_message,
+    upstream_error_message,
+)
+from metrics_module import record_usage, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+class AsyncLLMClient:
+    """Async counterpart of client_module.LLMClient with a cap on concurrent upstream calls
+
+    Requests beyond max_concurrency wait on a semaphore instead of a thread, so a
+    single process can hold hundreds of pending chats while staying under the
+    provider's rate limit.
+    """
+
+    def __init__(self, base_url, api_key, max_concurrency=20, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, connect_timeout=5.0, read_timeout=45.0, breaker=None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+
+    def backoff(self, attempt, retry_after=None):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+
+    async def post(self, payload, admit_retry=None):
+        """POST payload as JSON with the same retry and circuit-breaker rules as LLMClient.post
+
+        admit_retry, if given, is a coroutine function awaited before each retry.
+        """
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            self.in_flight += 1
+            try:
+                return await self._post_with_retries(payload, admit_retry)
+            finally:
+                self.in_flight -= 1
+
+    async def _post_with_retries(self, payload, admit_retry):
+        for attempt in range(self.max_retries + 1):
+            if attempt and admit_retry is not None:
+                await admit_retry()
+            if not self.breaker.allow():
+                raise CircuitOpenError("LLM upstream circuit breaker is open")
+
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self._send(payload)
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                if last_attempt or not isinstance(e, httpx.TransportError):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"LLM request failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = self.backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            logger.warning(f"LLM upstream returned {response.status_code}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _send(self, payload):
+        """POST once, timing connection setup (only when a new connection is opened) and time to headers"""
+        events = {}
+
+        async def trace(event_name, info):
+            events[event_name] = time.perf_counter()
+
+        started = time.perf_counter()
+        response = await self._client.post(self.base_url, json=payload, extensions={"trace": trace})
+
+        connect_started = events.get("connection.connect_tcp.started")
+        connected = events.get("connection.start_tls.complete") or events.get("connection.connect_tcp.complete")
+        if connect_started and connected:
+            stage_seconds.observe(connected - connect_started, stage="llm_connect")
+        headers = events.get("http11.receive_response_headers.complete") or \
+            events.get("http2.receive_response_headers.complete")
+        if headers:
+            stage_seconds.observe(headers - started, stage="llm_first_byte")
+        return response
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "breaker": self.breaker.state}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+# Coalesces identical in-flight LLM calls on the event loop
+async_llm_flight = AsyncSingleFlight()
+
+_async_llm_client = None
+
+def get_async_llm_client():
+    """Return the shared async Groq client, creating it inside the running event loop"""
+    global _async_llm_client
+    if _async_llm_client is None:
+        _async_llm_client = AsyncLLMClient(
+            GROQ_BASE_URL,
+            GROQ_API_KEY,
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "20")),
+            max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+            connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "45")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GROQ_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("GROQ_BREAKER_RESET", "30"))
+            )
+        )
+    return _async_llm_client
+
+async def close_async_llm_client():
+    global _async_llm_client
+    if _async_llm_client is not None:
+        await _async_llm_client.aclose()
+        _async_llm_client = None
+
+def _as_requests_error(error):
+    """Translate httpx exceptions so request_error_message picks the same user message"""
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(error))
+    return error
+
+async def fetch_llm_answer_async(llm_request):
+    """Async version of llm_module.fetch_llm_answer"""
+    logger.info(f"Making async API request for {llm_request.requested_crops} crops (Location: {llm_request.user_location if llm_request.user_location else 'General'})")
+
+    await llm_scheduler.admit_async(llm_request.tokens, llm_request.priority)
+
+    used = 0
+    try:
+        started = time.perf_counter()
+        # Retries count against the requests-per-minute quota; the reservation covers their tokens
+        response = await get_async_llm_client().post(
+            llm_request.payload, admit_retry=lambda: llm_scheduler.admit_async(0, llm_request.priority)
+        )
+        stage_seconds.observe(time.perf_counter() - started, stage="llm_total")
+
+        if response.status_code != 200:
+            return None, upstream_error_message(response.status_code)
+
+        result = response.json()
+        record_usage(result)
+        used = (result.get('usage') or {}).get('total_tokens')
+    finally:
+        # Failed calls give back their whole reservation
+        llm_scheduler.settle(llm_request.tokens, used)
+
+    if not result.get('choices') or not result['choices']:
+        logger.error("Invalid API response structure")
+        return None, "⚠️ <strong>Invalid response received.</strong> Please try again."
+
+    llm_response = result['choices'][0]['message']['content'].strip()
+
+    if not llm_response:
+        return None, "❓ <strong>Empty response received.</strong> Please rephrase your question."
+
+    with stage_seconds.time(stage="formatting"):
+        formatted_response = format_response_for_html(llm_response)
+    return complete_llm_response(llm_request, formatted_response), None
+
+async def generate_llm_answer_async(llm_request):
+    """Async version of llm_module.generate_llm_answer"""
+    try:
+        # Identical concurrent questions share one upstream call
+        answer, error_message = await async_llm_flight.do(
+            llm_request.cache_key, lambda: fetch_llm_answer_async(llm_request)
+        )
+        if error_message:
+            return error_message
+
+        logger.info("Successfully processed async request")
+        return answer + create_engagement_footer()
+
+    except Exception as e:
+        return request_error_message(_as_requests_error(e))
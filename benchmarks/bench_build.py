@@ -0,0 +1,72 @@
+"""Benchmark building the keyword database from a synthetic corpus.
+
+Run from the repository root:
+    python benchmarks/bench_build.py --documents 100000 [--workers 4] [--format both] [--output build.json]
+
+Times a full build, a no-op rebuild, an incremental rebuild after editing one
+section and (with --workers > 1) a parallel full build, each into a temporary
+directory. Wall time, documents per second and peak memory are reported.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import common
+from generate_corpus import generate
+from prepare_data import create_simple_database
+
+def edit_one_section(path):
+    """Change one number in the first section of path, so exactly one section is re-tokenized"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    lines[1] = lines[1].replace(" mm,", "1 mm,", 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+def timed_build(name, documents, **kwargs):
+    started = time.perf_counter()
+    if not create_simple_database(**kwargs):
+        raise RuntimeError(f"{name} build failed")
+    elapsed = time.perf_counter() - started
+    result = {
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(documents / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": common.peak_rss_mb()
+    }
+    print(f"{name:<22} {elapsed:8.2f} s  {result['docs_per_second']:>10} docs/s  "
+          f"peak {result['peak_rss_mb']} MB")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--format", choices=["json", "binary", "both"], default="both")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="agri-bench-") as tmp:
+        corpus_dir = os.path.join(tmp, "corpus")
+        paths = generate(args.documents, corpus_dir, args.files, seed=args.seed)
+        build = dict(inputs=[corpus_dir], output_format=args.format)
+
+        results["full"] = timed_build("full", args.documents, db_dir=os.path.join(tmp, "db"), full_rebuild=True, **build)
+        results["no_change"] = timed_build("incremental (no-op)", args.documents, db_dir=os.path.join(tmp, "db"), **build)
+        edit_one_section(paths[0])
+        results["one_section"] = timed_build("incremental (1 edit)", args.documents,
+                                             db_dir=os.path.join(tmp, "db"), **build)
+        if args.workers > 1:
+            results["parallel_full"] = timed_build(f"full ({args.workers} workers)", args.documents,
+                                                   db_dir=os.path.join(tmp, "db-parallel"), full_rebuild=True,
+                                                   workers=args.workers, **build)
+
+    common.write_results(args.output, "build", vars(args), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Micro-benchmark for the single-pass query analyzer.
+
+Run from the repository root:
+    python benchmarks/bench_query_analysis.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_module import analyze_query
+
+SAMPLE_QUERIES = [
+    "What are the top 2 crops to grow in Nagpur during monsoon?",
+    "Suggest crops based on 500mm rainfall and loamy soil.",
+    "which crop is best for my farm near Guntur",
+    "Give me a few kharif crops for Pune",
+    "best crops in tamil nadu for black soil with drip irrigation",
+    "How do I fix my laptop?",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    uncached = analyze_query.__wrapped__
+    total = args.iterations * len(SAMPLE_QUERIES)
+
+    seconds = timeit.timeit(lambda: [uncached(q) for q in SAMPLE_QUERIES], number=args.iterations)
+    print(f"analyze_query (uncached): {seconds / total * 1e6:.2f} µs/query")
+
+    seconds = timeit.timeit(lambda: [analyze_query(q) for q in SAMPLE_QUERIES], number=args.iterations)
+    print(f"analyze_query (cached):   {seconds / total * 1e6:.2f} µs/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark retrieval against a database built from a synthetic corpus.
+
+Run from the repository root:
+    python benchmarks/bench_retrieval.py --documents 100000 [--queries 500] [--output retrieval.json]
+
+Builds the corpus and database in a temporary directory (or serves --db-dir),
+then reports per-query latency of analyze_query, get_context_from_query with a
+cold and a warm retrieval cache, and get_contexts_for_queries in batches.
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+import common
+from generate_corpus import CROPS, IRRIGATION, SOILS, city_name, generate
+from location_module import INDIAN_STATES
+from prepare_data import create_simple_database
+import rag_module
+from query_module import analyze_query
+
+TEMPLATES = [
+    "What crops grow best in {city}?",
+    "Suggest crops for {soil} soil in {state}",
+    "Which crop is good for {city} with {irrigation} irrigation?",
+    "Top 3 crops for {state} with 800mm rainfall",
+    "Is {crop} suitable for {soil} soil near {city}?",
+    "best crops for {soil} soil and {irrigation} irrigation",
+    "where can I grow {crop} in {state}",
+]
+
+def sample_queries(count, documents, seed):
+    rng = random.Random(seed)
+    return [rng.choice(TEMPLATES).format(
+        city=city_name(rng.randrange(documents)),
+        state=rng.choice(INDIAN_STATES[:28]),
+        soil=rng.choice(SOILS).lower(),
+        irrigation=rng.choice(IRRIGATION).lower(),
+        crop=rng.choice(CROPS).lower()
+    ) for _ in range(count)]
+
+def report(name, samples, per_call=1):
+    summary = common.summarize([sample / per_call for sample in samples])
+    summary["queries_per_second"] = round(len(samples) * per_call / sum(samples), 1) if sum(samples) else None
+    print(f"{name:<28} p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms  "
+          f"p99 {summary['p99_ms']:8.3f} ms  {summary['queries_per_second']:>10} q/s")
+    return summary
+
+def run(db_dir, queries, batch_size):
+    rag_module.get_retriever().db_dir = db_dir
+    started = time.perf_counter()
+    snapshot = rag_module.get_retriever().snapshot()
+    if snapshot is None:
+        raise RuntimeError(f"No database in {db_dir}")
+    results = {"load_seconds": round(time.perf_counter() - started, 3), "documents": len(snapshot.database)}
+    print(f"Loaded {len(snapshot.database)} documents in {results['load_seconds']} s")
+
+    uncached_analysis = analyze_query.__wrapped__
+    results["analyze_query"] = report("analyze_query (uncached)", [
+        sample for query in queries for sample in common.time_calls(lambda: uncached_analysis(query), 1)])
+
+    cache = rag_module.retrieval_cache
+    cold = []
+    for query in queries:
+        if cache is not None:
+            cache.clear()
+        cold.extend(common.time_calls(lambda: rag_module.get_context_from_query(query), 1))
+    results["context_cold"] = report("get_context (cold cache)", cold)
+
+    for query in queries:
+        rag_module.get_context_from_query(query)
+    warm = [sample for query in queries for sample in common.time_calls(
+        lambda: rag_module.get_context_from_query(query), 1)]
+    results["context_warm"] = report("get_context (warm cache)", warm)
+
+    if cache is not None:
+        cache.clear()
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    batched = [sample for batch in batches for sample in common.time_calls(
+        lambda: rag_module.get_contexts_for_queries(batch), 1)]
+    results["contexts_batched"] = report(f"get_contexts (batch {batch_size})", batched, per_call=batch_size)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--format", choices=["json", "binary", "both"], default="both")
+    parser.add_argument("--db-dir", help="benchmark an existing database instead of a generated one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    queries = sample_queries(args.queries, args.documents, args.seed)
+    if args.db_dir:
+        results = run(args.db_dir, queries, args.batch_size)
+    else:
+        with tempfile.TemporaryDirectory(prefix="agri-bench-") as tmp:
+            generate(args.documents, os.path.join(tmp, "corpus"), seed=args.seed)
+            if not create_simple_database([os.path.join(tmp, "corpus")], args.format, db_dir=os.path.join(tmp, "db")):
+                raise RuntimeError("Database build failed")
+            results = run(os.path.join(tmp, "db"), queries, args.batch_size)
+
+    common.write_results(args.output, "retrieval", vars(args), results)
+
+if __name__ == "__main__":
+    main()
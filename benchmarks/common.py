@@ -0,0 +1,81 @@
+"""Shared helpers for the benchmark scripts: percentiles, peak memory and JSON results."""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples), max(1, math.ceil(fraction * len(sorted_samples)))) - 1
+    return sorted_samples[index]
+
+def summarize(samples):
+    """Latency summary in milliseconds for samples given in seconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4)
+    }
+
+def time_calls(fn, iterations):
+    """Call fn iterations times, returning the per-call latencies in seconds"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def write_results(path, benchmark, params, results):
+    """Write results with enough context (commit, machine, parameters) to compare runs"""
+    report = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+    return report
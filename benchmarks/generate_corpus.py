@@ -0,0 +1,78 @@
+"""Generate a synthetic crop corpus in the format of crop_recommendation_rag_text.txt.
+
+Run from the repository root:
+    python benchmarks/generate_corpus.py --documents 100000 --output /tmp/corpus [--files 8] [--seed 1]
+
+Each document is one "City, State has ... Recommended crops: ..." line; lines are
+grouped into state sections, and sections are spread over --files files.
+"""
+import argparse
+import os
+import random
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+from location_module import INDIAN_STATES
+
+SOILS = ["Alluvial", "Black", "Red", "Laterite", "Sandy", "Clayey", "Loamy"]
+IRRIGATION = ["Canal", "Well", "Tube well", "Drip", "Sprinkler", "Tank", "Rainfed"]
+CROPS = ["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Groundnut", "Soybean", "Millets", "Pulses",
+         "Bajra", "Jowar", "Mustard", "Barley", "Chilli", "Onion", "Grapes", "Banana", "Coconut",
+         "Tea", "Coffee", "Jute", "Potato", "Turmeric", "Paddy", "Oranges", "Cashew"]
+SYLLABLES = ["pur", "nagar", "abad", "gaon", "pet", "kot", "garh", "wadi", "palli", "halli", "ganj", "ur"]
+PREFIXES = ["Ram", "Shiv", "Chandra", "Kali", "Hari", "Mani", "Sona", "Bhima", "Krishna", "Indra",
+            "Sri", "Raja", "Vijay", "Anand", "Deva", "Lakshmi", "Gopal", "Surya", "Nila", "Tara"]
+
+def city_name(n):
+    # Distinct, letters-only names per index ("Ramnagar", "Shivpetb"), as the gazetteer expects
+    base = PREFIXES[n % len(PREFIXES)] + SYLLABLES[(n // len(PREFIXES)) % len(SYLLABLES)]
+    suffix = n // (len(PREFIXES) * len(SYLLABLES))
+    letters = ""
+    while suffix:
+        suffix, digit = divmod(suffix, 26)
+        letters += chr(ord('a') + digit)
+    return base + letters
+
+def document_line(rng, n, state):
+    crops = ", ".join(rng.sample(CROPS, rng.randint(2, 4)))
+    return (
+        f"{city_name(n)}, {state} has {rng.choice(SOILS)} soil, avg rainfall {rng.randint(200, 3000)} mm, "
+        f"avg temp {rng.randint(12, 36)}°C, irrigation: {rng.choice(IRRIGATION)}. Recommended crops: {crops}."
+    )
+
+def generate(documents, output, files=1, lines_per_section=5, seed=1):
+    """Write the corpus; returns the list of files written"""
+    rng = random.Random(seed)
+    os.makedirs(output, exist_ok=True)
+    paths = [os.path.join(output, f"corpus-{i:03d}.txt") for i in range(files)]
+    handles = [open(path, "w", encoding="utf-8") for path in paths]
+    try:
+        n = 0
+        section = 0
+        while n < documents:
+            state = rng.choice(INDIAN_STATES[:28])
+            lines = []
+            for _ in range(min(lines_per_section, documents - n)):
+                lines.append(document_line(rng, n, state))
+                n += 1
+            handles[section % files].write(f"{state} Crop Data {section}\n" + "\n".join(lines) + "\n\n")
+            section += 1
+    finally:
+        for handle in handles:
+            handle.close()
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--output", required=True, help="directory to write corpus-NNN.txt files into")
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--lines-per-section", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = generate(args.documents, args.output, args.files, args.lines_per_section, args.seed)
+    size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+    print(f"Wrote {args.documents} documents ({size_mb:.1f} MB) to {len(paths)} file(s) in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Open-loop load test of POST /chat at a target request rate.
+
+Run from the repository root:
+    python benchmarks/load_test.py --qps 20 --duration 30 [--latency 0.5] [--error-rate 0.01] [--output load.json]
+
+By default the stub LLM (stub_llm_server.py) and the Flask app are started in
+this process on free ports, serving ./simple_db or, with --documents, a database
+built from a synthetic corpus. With --url, an already running app is tested
+instead (point its GROQ_BASE_URL at a stub server yourself).
+
+Requests are sent on a fixed schedule whether or not earlier ones have finished,
+and latency is measured from each request's scheduled start, so queueing in the
+app shows up in the percentiles instead of silently lowering the request rate.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+from bench_retrieval import sample_queries
+from generate_corpus import generate
+from stub_llm_server import make_stub_server
+
+def start_in_background(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_app(stub_url, db_dir=None):
+    """Import the Flask app against the stub LLM and serve it on a free port; returns its base URL"""
+    # llm_module reads these at import time
+    os.environ["GROQ_BASE_URL"] = stub_url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    # The stub has no quota; set GROQ_RPM / GROQ_TPM to test the scheduler's shedding
+    os.environ.setdefault("GROQ_RPM", "0")
+    from werkzeug.serving import make_server
+    import app as chat_app
+    from rag_module import get_retriever
+
+    if db_dir:
+        get_retriever().db_dir = db_dir
+    if get_retriever().snapshot() is None:
+        logging.warning("No keyword database found - /chat will answer without retrieved context")
+    server = start_in_background(make_server("127.0.0.1", 0, chat_app.app, threaded=True))
+    return f"http://127.0.0.1:{server.server_port}"
+
+def post_chat(url, query, timeout):
+    """Send one request; returns the HTTP status, or the exception's name when there was no response"""
+    request = urllib.request.Request(url, data=json.dumps({"query": query}).encode('utf-8'),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception as e:
+        return type(e).__name__
+
+def run_load(url, queries, qps, duration, concurrency, timeout):
+    """Send qps requests per second for duration seconds; returns (latencies of 200s, status counts, elapsed)"""
+    total = int(qps * duration)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def send(i, scheduled):
+        status = post_chat(url, queries[i % len(queries)], timeout)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(total):
+            scheduled = started + i / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, i, scheduled)
+    return latencies, statuses, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running app (default: start the app and stub in-process)")
+    parser.add_argument("--qps", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=256, help="maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--queries", type=int, default=1000, help="distinct queries to cycle through")
+    parser.add_argument("--documents", type=int, help="serve a database built from this many synthetic documents")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stub LLM extra random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub LLM calls that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    queries = sample_queries(args.queries, args.documents or 10000, args.seed)
+    with tempfile.TemporaryDirectory(prefix="agri-load-") as tmp:
+        base_url = args.url
+        if not base_url:
+            stub = start_in_background(make_stub_server(port=0, latency=args.latency, jitter=args.jitter,
+                                                        error_rate=args.error_rate, seed=args.seed))
+            db_dir = None
+            if args.documents:
+                from prepare_data import create_simple_database
+                generate(args.documents, os.path.join(tmp, "corpus"), seed=args.seed)
+                db_dir = os.path.join(tmp, "db")
+                if not create_simple_database([os.path.join(tmp, "corpus")], db_dir=db_dir):
+                    raise RuntimeError("Database build failed")
+            base_url = start_app(f"http://127.0.0.1:{stub.server_port}/v1/chat/completions", db_dir)
+            logging.getLogger().setLevel(logging.WARNING)
+
+        print(f"Sending {args.qps} requests/s for {args.duration} s to {base_url}/chat")
+        latencies, statuses, elapsed = run_load(base_url.rstrip('/') + "/chat", queries, args.qps,
+                                                args.duration, args.concurrency, args.timeout)
+
+    results = common.summarize(latencies)
+    results.update({
+        "requests": sum(statuses.values()),
+        "statuses": dict(statuses),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None
+    })
+    print(f"{results['requests']} requests in {elapsed:.1f} s, {results['throughput_rps']} successful/s, "
+          f"statuses {dict(statuses)}")
+    if latencies:
+        print(f"latency p50 {results['p50_ms']:.1f} ms  p95 {results['p95_ms']:.1f} ms  "
+              f"p99 {results['p99_ms']:.1f} ms  max {results['max_ms']:.1f} ms")
+    common.write_results(args.output, "load", vars(args), results)
+
+if __name__ == "__main__":
+    main()
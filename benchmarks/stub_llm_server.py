@@ -0,0 +1,119 @@
+"""Local OpenAI-compatible chat completions stub for load tests.
+
+Run from the repository root:
+    python benchmarks/stub_llm_server.py [--port 8765] [--latency 0.5] [--jitter 0.2] [--error-rate 0.01]
+
+Then point the app at it:
+    GROQ_BASE_URL=http://127.0.0.1:8765/v1/chat/completions GROQ_API_KEY=stub python app.py
+
+Every POST is answered with a fixed crop recommendation after --latency seconds
+(plus up to --jitter); a --error-rate fraction of requests fail with 500 or 429
+instead. "stream": true requests get server-sent events split into --chunks pieces.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "**1. Rice**\n"
+    "- Suited to alluvial soil and high rainfall\n"
+    "- Sow at the start of the monsoon\n\n"
+    "**2. Groundnut**\n"
+    "- Grows well in sandy loam with moderate rainfall\n"
+    "- Needs well-drained fields\n"
+)
+
+def make_handler(latency, jitter, error_rate, chunks, seed=None):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+            except ValueError:
+                payload = {}
+            with rng_lock:
+                delay = latency + rng.uniform(0, jitter)
+                failure = rng.random() < error_rate
+                status = rng.choice((500, 429))
+            time.sleep(delay)
+
+            if failure:
+                self.send_json(status, {"error": {"message": "stub failure", "type": "server_error"}})
+            elif payload.get('stream'):
+                self.send_stream(payload)
+            else:
+                self.send_json(200, {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "model": payload.get('model', 'stub'),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER},
+                                 "finish_reason": "stop"}],
+                    "usage": usage(payload)
+                })
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_stream(self, payload):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            size = max(1, len(ANSWER) // chunks)
+            for start in range(0, len(ANSWER), size):
+                event = {"choices": [{"index": 0, "delta": {"content": ANSWER[start:start + size]}}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage(payload)})}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def usage(payload):
+    # Roughly 4 characters per token, like the app's fallback estimate
+    prompt_tokens = sum(len(message.get('content', '')) for message in payload.get('messages', [])) // 4
+    completion_tokens = len(ANSWER) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+def make_stub_server(host="127.0.0.1", port=8765, latency=0.5, jitter=0.0, error_rate=0.0, chunks=8, seed=None):
+    """Create (but don't start) the stub server; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), make_handler(latency, jitter, error_rate, chunks, seed))
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500/429")
+    parser.add_argument("--chunks", type=int, default=8, help="pieces a streamed answer is split into")
+    args = parser.parse_args()
+
+    server = make_stub_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.chunks)
+    print(f"Stub LLM listening on http://{args.host}:{server.server_address[1]}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
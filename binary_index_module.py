@@ -0,0 +1,229 @@
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import accumulate
+
+BINARY_INDEX_FILE = "index.bin"
+# Written last by prepare_data.py, once every other file of a build is in place
+MANIFEST_FILE = "manifest.json"
+
+MAGIC = b"AGIX"
+VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+
+# Header: magic, version, byte order mark, document count, term count
+HEADER = struct.Struct("=4sIIII")
+SECTION_ENTRY = struct.Struct("=QQ")  # offset, length
+
+# (name, array typecode) in file order; typecode None marks a raw UTF-8 blob
+SECTIONS = [
+    ("term_offsets", "I"),      # num_terms + 1 byte offsets into term_blob
+    ("term_blob", None),        # sorted terms, concatenated
+    ("postings_offsets", "I"),  # num_terms + 1 indexes into postings
+    ("postings", "I"),          # delta-encoded doc ids per term
+    ("term_freqs", "I"),        # term frequency for each posting
+    ("doc_lengths", "I"),       # indexed word count of each document
+    ("parents", "I"),           # section each chunk belongs to
+    ("token_counts", "I"),      # LLM tokens in each chunk's text
+    ("title_offsets", "Q"),
+    ("title_blob", None),
+    ("text_offsets", "Q"),
+    ("text_blob", None),
+]
+
+def _blob_with_offsets(strings):
+    offsets = array("Q", [0])
+    parts = []
+    for value in strings:
+        encoded = value.encode("utf-8")
+        parts.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+    return offsets, b"".join(parts)
+
+def write_binary_index(database, keywords_index, path):
+    """Write the database and keyword index in the compact memory-mappable format
+
+    The file is written to a temporary name and renamed into place, so readers that
+    already mapped the previous file keep a consistent view of it.
+    """
+    # Sort by encoded bytes so lookups can binary search on raw bytes
+    terms = sorted(keywords_index, key=lambda term: term.encode("utf-8"))
+
+    term_offsets, term_blob = _blob_with_offsets(terms)
+    postings_offsets = array("I", [0])
+    postings = array("I")
+    term_freqs = array("I")
+    for term in terms:
+        previous = 0
+        for doc_id in sorted(keywords_index[term]):
+            postings.append(doc_id - previous)
+            term_freqs.append(database[doc_id].get("term_freqs", {}).get(term, 1))
+            previous = doc_id
+        postings_offsets.append(len(postings))
+
+    doc_lengths = array("I", [doc.get("length", 0) for doc in database])
+    parents = array("I", [doc.get("parent", doc_id) for doc_id, doc in enumerate(database)])
+    token_counts = array("I", [doc.get("tokens", 0) for doc in database])
+    title_offsets, title_blob = _blob_with_offsets(doc["title"] for doc in database)
+    text_offsets, text_blob = _blob_with_offsets(doc["full_text"] for doc in database)
+
+    payloads = {
+        "term_offsets": array("I", term_offsets).tobytes(),
+        "term_blob": term_blob,
+        "postings_offsets": postings_offsets.tobytes(),
+        "postings": postings.tobytes(),
+        "term_freqs": term_freqs.tobytes(),
+        "doc_lengths": doc_lengths.tobytes(),
+        "parents": parents.tobytes(),
+        "token_counts": token_counts.tobytes(),
+        "title_offsets": title_offsets.tobytes(),
+        "title_blob": title_blob,
+        "text_offsets": text_offsets.tobytes(),
+        "text_blob": text_blob,
+    }
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(database), len(terms)))
+        table_offset = f.tell()
+        f.write(b"\0" * SECTION_ENTRY.size * len(SECTIONS))
+
+        entries = []
+        for name, _ in SECTIONS:
+            # Keep every section 8-byte aligned so memoryview casts are valid
+            f.write(b"\0" * (-f.tell() % 8))
+            entries.append((f.tell(), len(payloads[name])))
+            f.write(payloads[name])
+
+        f.seek(table_offset)
+        for offset, length in entries:
+            f.write(SECTION_ENTRY.pack(offset, length))
+
+    os.replace(tmp_path, path)
+
+class BinaryIndex:
+    """Read-only, memory-mapped view of an index written by write_binary_index
+
+    Exposes `database` and `keywords_index` shaped like the JSON format, but decodes
+    documents and postings lazily, so loading is O(1) and pages are shared between
+    processes that map the same file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, byte_order, self.num_docs, self.num_terms = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} binary index")
+        if byte_order != BYTE_ORDER_MARK:
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+
+        self._sections = {}
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(view, HEADER.size + i * SECTION_ENTRY.size)
+            section = view[offset:offset + length]
+            self._sections[name] = section.cast(typecode) if typecode else section
+
+        self.doc_lengths = self._sections["doc_lengths"]
+        self.database = _DocumentsView(self)
+        self.keywords_index = _PostingsView(self)
+
+    def _term_at(self, i):
+        offsets = self._sections["term_offsets"]
+        return bytes(self._sections["term_blob"][offsets[i]:offsets[i + 1]])
+
+    def find_term(self, term):
+        """Binary search the term dictionary, returning the term's position or -1"""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms and self._term_at(lo) == key:
+            return lo
+        return -1
+
+    def _postings_range(self, term):
+        i = self.find_term(term)
+        if i < 0:
+            return None
+        offsets = self._sections["postings_offsets"]
+        return offsets[i], offsets[i + 1]
+
+    def postings(self, term):
+        """Return the sorted doc ids containing term, or None"""
+        bounds = self._postings_range(term)
+        if bounds is None:
+            return None
+        start, end = bounds
+        return list(accumulate(self._sections["postings"][start:end]))
+
+    def term_frequencies(self, term):
+        """Return term frequencies aligned with postings(term), or None"""
+        bounds = self._postings_range(term)
+        if bounds is None:
+            return None
+        start, end = bounds
+        return self._sections["term_freqs"][start:end].tolist()
+
+    def _text(self, blob, i):
+        offsets = self._sections[blob + "_offsets"]
+        return bytes(self._sections[blob + "_blob"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def document(self, doc_id):
+        full_text = self._text("text", doc_id)
+        return {
+            'id': doc_id,
+            'parent': self._sections["parents"][doc_id],
+            'title': self._text("title", doc_id),
+            'content': full_text,
+            'full_text': full_text,
+            'length': self.doc_lengths[doc_id],
+            'tokens': self._sections["token_counts"][doc_id]
+        }
+
+    def terms(self):
+        for i in range(self.num_terms):
+            yield self._term_at(i).decode("utf-8")
+
+class _DocumentsView(Sequence):
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.num_docs
+
+    def __getitem__(self, doc_id):
+        if isinstance(doc_id, slice):
+            return [self[i] for i in range(*doc_id.indices(len(self)))]
+        if doc_id < 0:
+            doc_id += len(self)
+        if not 0 <= doc_id < len(self):
+            raise IndexError(doc_id)
+        return self._index.document(doc_id)
+
+class _PostingsView(Mapping):
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.num_terms
+
+    def __iter__(self):
+        return self._index.terms()
+
+    def __contains__(self, term):
+        return isinstance(term, str) and self._index.find_term(term) >= 0
+
+    def __getitem__(self, term):
+        postings = self._index.postings(term)
+        if postings is None:
+            raise KeyError(term)
+        return postings
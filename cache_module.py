@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace so trivially different queries share a key"""
+    if not query:
+        return ""
+    query = re.sub(r'[^\w\s]', ' ', query.lower())
+    return ' '.join(query.split())
+
+def make_cache_key(query, context, params):
+    """Build a cache key from the normalized query, the retrieved context and the prompt parameters"""
+    context_hash = hashlib.sha256((context or "").encode('utf-8')).hexdigest()
+    payload = json.dumps([normalize_query(query), context_hash, params], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry expiry and an optional SQLite tier that survives restarts"""
+
+    def __init__(self, max_size=512, ttl=3600, db_path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening response cache database: {str(e)}")
+                self._db = None
+
+    def get(self, key):
+        """Return the cached value or None, counting a hit or a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            row = self._get_from_disk(key, now)
+            if row is not None:
+                value, expires_at = row
+                self._remember(key, value, expires_at)
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now + self.ttl)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, now + self.ttl)
+                    )
+                    self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing response cache: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None
+            }
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _get_from_disk(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+        return row
+
+class RetrievalCache:
+    """Thread-safe LRU cache of assembled contexts, emptied whenever the index generation changes"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.generation = None
+        self._entries = OrderedDict()  # key -> context
+        self._lock = threading.Lock()
+
+    def get(self, generation, key):
+        """Return the context cached for key in this index generation, or None"""
+        with self._lock:
+            if generation != self.generation:
+                self._entries.clear()
+                self.generation = generation
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, generation, key, value):
+        with self._lock:
+            if generation != self.generation:
+                # Computed against an index that has since been replaced
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
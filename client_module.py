@@ -0,0 +1,214 @@
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics_module import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying; only 5xx counts against the circuit breaker
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without contacting the upstream while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, then lets one trial request through
+
+    A trial that never reports back (e.g. its caller died) is given up on after
+    reset_timeout, and the next call becomes the new trial.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half-open"
+                self._trial_started = now
+                return True
+            if self.state == "half-open":
+                # A trial request is already in flight, unless it was lost
+                if now - self._trial_started < self.reset_timeout:
+                    return False
+                self._trial_started = now
+                return True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit breaker opened for LLM upstream")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header (seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_delay(attempt, backoff_base, backoff_max, retry_after=None):
+    """Delay before the next attempt: Retry-After if given, else exponential with full jitter"""
+    if retry_after is not None:
+        return min(retry_after, backoff_max)
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+def iter_stream_deltas(lines, usage=None):
+    """Yield content deltas from the Server-Sent-Events lines of a streamed chat completion
+
+    If usage is a dict, it is filled in from the final chunk's usage field, sent
+    when the request asks for it with stream_options.include_usage.
+    """
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            logger.warning("Skipping malformed stream chunk")
+            continue
+        if usage is not None:
+            # Groq also reports it under x_groq on the last content chunk
+            usage.update(chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or {})
+        choices = chunk.get("choices") or []
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+class _ConnectTimingMixin:
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        stage_seconds.observe(time.perf_counter() - started, stage="llm_connect")
+
+class _TimedHTTPConnection(_ConnectTimingMixin, HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_ConnectTimingMixin, HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that records how long each new upstream connection (TCP + TLS) takes to open"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+class LLMClient:
+    """Connection-pooled client for an OpenAI-compatible chat completions endpoint"""
+
+    def __init__(self, base_url, api_key, pool_size=10, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, connect_timeout=5.0, read_timeout=45.0, breaker=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+
+        # Keep-alive connections, sized to the number of worker threads
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def backoff(self, attempt, retry_after=None):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+
+    def post(self, payload, admit_retry=None, **kwargs):
+        """POST payload as JSON, retrying connection errors and retryable statuses
+
+        Returns the last response (which may still be an error status once retries
+        are exhausted). Raises CircuitOpenError while the upstream is considered down.
+        admit_retry, if given, is called before each retry and may block or raise,
+        so retries stay within the caller's rate limits.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt and admit_retry is not None:
+                admit_retry()
+            if not self.breaker.allow():
+                raise CircuitOpenError("LLM upstream circuit breaker is open")
+
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(self.base_url, json=payload, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.breaker.record_failure()
+                retryable = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                if last_attempt or not retryable:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"LLM request failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = self.backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            logger.warning(f"LLM upstream returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
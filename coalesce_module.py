@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key across threads
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._in_flight.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    async def do(self, key, coro_fn):
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so one cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        self.calls += 1
+        future = asyncio.ensure_future(coro_fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
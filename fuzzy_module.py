@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+def word_trigrams(word):
+    """Return the set of character trigrams of a word, padded so short words still have some"""
+    padded = f"$${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_trigram_index(vocabulary):
+    """Map each trigram to the sorted list of vocabulary words containing it"""
+    trigram_index = defaultdict(list)
+    for word in sorted(vocabulary):
+        for trigram in word_trigrams(word):
+            trigram_index[trigram].append(word)
+    return dict(trigram_index)
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance between a and b, or max_distance + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def default_max_distance(word):
+    """Allowed typos for a word - short words must match exactly"""
+    if len(word) < 5:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+def fuzzy_lookup(word, trigram_index, max_distance=None, min_similarity=0.3, limit=3):
+    """Find vocabulary words close to `word`, returned as [(keyword, distance)] best first
+
+    Only the postings of the word's own trigrams are visited, so the cost depends on
+    how many keywords share trigrams with the word rather than on the vocabulary size.
+    """
+    if max_distance is None:
+        max_distance = default_max_distance(word)
+    if max_distance <= 0 or not word:
+        return []
+
+    trigrams = word_trigrams(word)
+    shared = defaultdict(int)
+    for trigram in trigrams:
+        for keyword in trigram_index.get(trigram, ()):
+            shared[keyword] += 1
+
+    matches = []
+    for keyword, count in shared.items():
+        # Dice coefficient on trigram sets prunes most candidates before edit distance
+        similarity = 2 * count / (len(trigrams) + len(keyword) + 1)
+        if similarity < min_similarity:
+            continue
+        distance = edit_distance(word, keyword, max_distance)
+        if distance <= max_distance:
+            matches.append((keyword, distance))
+
+    matches.sort(key=lambda match: (match[1], match[0]))
+    return matches[:limit]
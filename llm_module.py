@@ -2,7 +2,17 @@ import os
 import requests
 import logging
 import re
+import threading
+import time
 from dotenv import load_dotenv
+from cache_module import ResponseCache, make_cache_key
+from coalesce_module import SingleFlight
+from query_module import analyze_query
+from client_module import LLMClient, CircuitBreaker, CircuitOpenError, iter_stream_deltas
+from semantic_cache_module import SemanticCache, DEFAULT_EMBEDDING_MODEL
+from metrics_module import cache_hits_total, record_usage, stage_seconds, upstream_errors_total
+from scheduler_module import BATCH, INTERACTIVE, LLMScheduler, SchedulerBusyError
+from token_module import count_tokens
 
 # Load environment variables
 load_dotenv()
@@ -10,7 +20,73 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "llama3-8b-8192"
+GROQ_TEMPERATURE = 0.7
+GROQ_MAX_TOKENS = 1000
+
+# Cache of formatted answers in front of the LLM call. Set RESPONSE_CACHE_DB to
+# a file path to keep answers across restarts; RESPONSE_CACHE_SIZE=0 disables it.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+response_cache = ResponseCache(
+    max_size=RESPONSE_CACHE_SIZE,
+    ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    db_path=os.getenv("RESPONSE_CACHE_DB") or None
+) if RESPONSE_CACHE_SIZE > 0 else None
+
+# Optional cache for paraphrased questions, using a local embedding model
+semantic_cache = SemanticCache(
+    model_name=os.getenv("SEMANTIC_CACHE_MODEL", DEFAULT_EMBEDDING_MODEL),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    max_size=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+    ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+) if os.getenv("SEMANTIC_CACHE", "").lower() in ("1", "true", "yes") else None
+
+# Replies for queries that are answered without calling the LLM
+CONFIG_ERROR_REPLY = "❌ <strong>API configuration error.</strong> Please contact support."
+INVALID_QUERY_REPLY = "❓ <strong>Please provide a valid question about crops.</strong>"
+OFF_TOPIC_REPLY = "🌾 <strong>I'm a farming advisor and can only help with agriculture-related questions.</strong><br><br>Please ask me about:<br>• Crop recommendations<br>• Farming advice<br>• Agricultural practices<br>• Growing conditions<br>• Soil and climate information"
+QUERY_TOO_LONG_REPLY = "📝 <strong>Question too long.</strong> Please ask something shorter."
+BUSY_REPLY = "🚦 <strong>Lots of farmers are asking right now.</strong> Please try again in a minute."
+
+# Coalesces identical in-flight LLM calls across threads
+llm_flight = SingleFlight()
+
+# Keeps upstream calls within the Groq quota (GROQ_RPM requests and GROQ_TPM tokens
+# per minute, 0 = unlimited); calls over it queue, interactive ahead of batch, and
+# are turned away with BUSY_REPLY once the queue is full or they waited too long
+llm_scheduler = LLMScheduler(
+    requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+    tokens_per_minute=int(os.getenv("GROQ_TPM", "0")),
+    max_queue=int(os.getenv("LLM_QUEUE_SIZE", "100")),
+    max_wait={
+        INTERACTIVE: float(os.getenv("LLM_QUEUE_TIMEOUT", "15")),
+        BATCH: float(os.getenv("LLM_BATCH_QUEUE_TIMEOUT", "120"))
+    }
+)
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Return the shared, connection-pooled Groq client"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient(
+                    GROQ_BASE_URL,
+                    GROQ_API_KEY,
+                    pool_size=int(os.getenv("GROQ_POOL_SIZE", "10")),
+                    max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+                    connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+                    read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "45")),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv("GROQ_BREAKER_THRESHOLD", "5")),
+                        reset_timeout=float(os.getenv("GROQ_BREAKER_RESET", "30"))
+                    )
+                )
+    return _llm_client
 
 def truncate_context(context, max_chars=3000):
     """Truncate context to prevent payload size issues"""
@@ -29,31 +105,7 @@ def extract_location_from_query(query):
     """Extract location information from user query only if explicitly mentioned"""
     if not query:
         return None
-        
-    query_lower = query.lower()
-    
-    # Look for explicit location mentions with keywords
-    location_patterns = [
-        r'\bin\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)',
-        r'\bfrom\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)',
-        r'\bat\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)',
-        r'\bnear\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)',
-        r'\baround\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)',
-        r'\bfor\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)'
-    ]
-    
-    for pattern in location_patterns:
-        matches = re.findall(pattern, query_lower)
-        for match in matches:
-            location = match.strip()
-            # Remove common non-location words
-            location = re.sub(r'\b(my|area|region|place|farm|field|growing|crops|agriculture)\b', '', location, flags=re.IGNORECASE).strip()
-            # Clean up and check if it looks like a real location
-            location = re.sub(r'[^\w\s]', '', location).strip().title()
-            if location and len(location) > 2 and not location.lower() in ['summer', 'winter', 'monsoon', 'season']:
-                return location
-    
-    return None
+    return analyze_query(query).location
 
 def check_location_in_context(context, user_location):
     """Check if location exists in context and determine match type"""
@@ -102,32 +154,7 @@ def prepare_context_for_query(context, user_location, match_type):
 
 def extract_crop_count_from_query(query):
     """Extract number of crops requested from user query"""
-    if not query:
-        return 4
-        
-    query_lower = query.lower()
-    
-    # Look for numbers
-    numbers = re.findall(r'\b(one|two|three|four|five|six|seven|eight|nine|ten|\d+)\b', query_lower)
-    
-    number_map = {
-        'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-        'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
-    }
-    
-    for num in numbers:
-        if num.isdigit():
-            return min(int(num), 8)
-        elif num in number_map:
-            return number_map[num]
-    
-    # Default based on context
-    if any(word in query_lower for word in ['few', 'some', 'several']):
-        return 3
-    elif any(word in query_lower for word in ['many', 'multiple', 'various']):
-        return 5
-    
-    return 4
+    return analyze_query(query).crop_count
 
 def format_response_for_html(response):
     """Convert markdown-style formatting to HTML for proper display"""
@@ -150,6 +177,51 @@ def format_response_for_html(response):
     
     return '\n'.join(formatted_lines)
 
+class StreamingHTMLFormatter:
+    """Applies format_response_for_html incrementally to streamed text
+
+    The concatenated output equals format_response_for_html(full_text). Text is
+    released as soon as it can no longer be affected by a bullet at the start of
+    its line or by a **bold** pair; anything after an unmatched '*' is held back
+    until the line ends.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._plain_line = False  # The current line is known not to be a bullet
+
+    def feed(self, text):
+        self._pending += text
+        output = []
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            output.append(self._format_line(line) + '\n')
+            self._plain_line = False
+        output.append(self._release_partial_line())
+        return ''.join(output)
+
+    def close(self):
+        remainder = self._format_line(self._pending) if self._pending else ""
+        self._pending = ""
+        self._plain_line = False
+        return remainder
+
+    def _format_line(self, line):
+        if self._plain_line:
+            return re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
+        return format_response_for_html(line)
+
+    def _release_partial_line(self):
+        if not self._plain_line:
+            stripped = self._pending.lstrip()
+            if len(stripped) < 2 or stripped.startswith(('* ', '- ')):
+                return ""
+            self._plain_line = True
+        star = self._pending.find('*')
+        released = self._pending if star < 0 else self._pending[:star]
+        self._pending = self._pending[len(released):]
+        return released
+
 def create_engagement_footer():
     """Create an engaging footer for responses"""
     footers = [
@@ -180,75 +252,101 @@ def is_agriculture_related_query(query):
     """Check if the query is related to agriculture/farming"""
     if not query:
         return False
+    return analyze_query(query).is_agriculture
+
+class LLMRequest:
+    """A validated query with its Groq payload and what is needed to finish the answer"""
+
+    def __init__(self, query, payload, user_location, match_type, requested_crops, cache_key,
+                 query_vector=None, semantic_scope=None, priority=INTERACTIVE):
+        self.query = query
+        self.payload = payload
+        # Reserved against the tokens-per-minute quota: the prompt plus the longest possible answer
+        self.tokens = sum(count_tokens(message['content']) for message in payload['messages']) \
+            + payload.get('max_tokens', 0)
+        self.priority = priority
+        self.user_location = user_location
+        self.match_type = match_type
+        self.requested_crops = requested_crops
+        self.cache_key = cache_key
+        self.query_vector = query_vector
+        self.semantic_scope = semantic_scope
+
+def prepare_llm_request(query, context, analysis=None, priority=INTERACTIVE):
+    """Validate the query and build the LLM request
+
+    Returns (reply, None) when the query can be answered without calling the LLM
+    (invalid or off-topic query, cache hit), otherwise (None, LLMRequest).
+    Pass the query's analysis if it was already computed for retrieval; priority
+    orders the call in the LLM scheduler's queue.
+    """
+    # Validate inputs
+    if not GROQ_API_KEY:
+        return CONFIG_ERROR_REPLY, None
     
-    query_lower = query.lower()
-    
-    # Agriculture-related keywords
-    agriculture_keywords = [
-        'crop', 'crops', 'farming', 'farm', 'agriculture', 'agricultural', 'plant', 'planting',
-        'grow', 'growing', 'harvest', 'field', 'soil', 'seed', 'seeds', 'fertilizer',
-        'irrigation', 'cultivation', 'cultivate', 'yield', 'production', 'farmer',
-        'wheat', 'rice', 'corn', 'maize', 'sugarcane', 'cotton', 'vegetable', 'fruit',
-        'season', 'monsoon', 'kharif', 'rabi', 'zaid', 'sowing', 'reaping',
-        'pesticide', 'herbicide', 'organic', 'profit', 'income', 'market', 'price',
-        'climate', 'weather', 'rain', 'drought', 'water', 'land', 'acre', 'hectare'
-    ]
+    if not query or not context:
+        return INVALID_QUERY_REPLY, None
     
-    # Check if query contains agriculture keywords
-    for keyword in agriculture_keywords:
-        if keyword in query_lower:
-            return True
+    if analysis is None:
+        analysis = analyze_query(query)
     
-    # Check for agriculture-related phrases
-    agriculture_phrases = [
-        'what to grow', 'which crop', 'best for farming', 'agricultural advice',
-        'farming tips', 'crop recommendation', 'suitable for cultivation',
-        'high yield', 'profitable crops', 'cash crops', 'food crops'
-    ]
+    # Check if query is agriculture-related
+    if not analysis.is_agriculture:
+        return OFF_TOPIC_REPLY, None
     
-    for phrase in agriculture_phrases:
-        if phrase in query_lower:
-            return True
+    # Location is only extracted if explicitly mentioned
+    user_location = analysis.location
     
-    return False
-
-def get_llm_response(query, context):
-    """Get crop recommendation response from Groq LLM with smart location handling"""
-    try:
-        # Validate inputs
-        if not GROQ_API_KEY:
-            return "❌ <strong>API configuration error.</strong> Please contact support."
-        
-        if not query or not context:
-            return "❓ <strong>Please provide a valid question about crops.</strong>"
-        
-        # Check if query is agriculture-related
-        if not is_agriculture_related_query(query):
-            return "🌾 <strong>I'm a farming advisor and can only help with agriculture-related questions.</strong><br><br>Please ask me about:<br>• Crop recommendations<br>• Farming advice<br>• Agricultural practices<br>• Growing conditions<br>• Soil and climate information"
-        
-        # Extract location only if explicitly mentioned
-        user_location = extract_location_from_query(query)
-        
-        # Determine how to handle the context
-        if user_location:
-            match_type = check_location_in_context(context, user_location)
-            prepared_context = prepare_context_for_query(context, user_location, match_type)
-            location_instruction = f"Focus on recommendations for {user_location} based on available data."
-            farm_location = user_location
+    # Determine how to handle the context
+    if user_location:
+        # Places from the gazetteer are in the corpus and retrieval boosted their
+        # documents; only unrecognised names need the context scanned
+        if analysis.places:
+            match_type = "exact"
         else:
-            match_type = "general"
-            prepared_context = prepare_context_for_query(context, None, None)
-            location_instruction = "Provide general recommendations based on all available agricultural data from various regions."
-            farm_location = "General (multiple regions)"
-        
-        # Truncate context
-        truncated_context = truncate_context(prepared_context, max_chars=2500)
-        
-        # Get crop count
-        requested_crops = extract_crop_count_from_query(query)
-        
-        # Build location-aware prompt
-        prompt = f"""You are a helpful farming advisor. Give practical crop recommendations.
+            match_type = check_location_in_context(context, user_location)
+        prepared_context = prepare_context_for_query(context, user_location, match_type)
+        location_instruction = f"Focus on recommendations for {user_location} based on available data."
+        farm_location = user_location
+    else:
+        match_type = "general"
+        prepared_context = prepare_context_for_query(context, None, None)
+        location_instruction = "Provide general recommendations based on all available agricultural data from various regions."
+        farm_location = "General (multiple regions)"
+    
+    # Truncate context
+    truncated_context = truncate_context(prepared_context, max_chars=2500)
+    
+    # Get crop count
+    requested_crops = analysis.crop_count
+    
+    # Serve repeated questions from the cache; the footer is re-rolled each time
+    cache_key = make_cache_key(query, truncated_context, {
+        "model": GROQ_MODEL,
+        "temperature": GROQ_TEMPERATURE,
+        "crops": requested_crops,
+        "location": user_location
+    })
+    if response_cache is not None:
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            logger.info("Serving cached response")
+            cache_hits_total.inc(cache="response")
+            return cached_response + create_engagement_footer(), None
+    
+    # Paraphrases only match answers for the same location and crop count
+    query_vector = None
+    semantic_scope = ((user_location or "").lower(), requested_crops)
+    if semantic_cache is not None:
+        query_vector = semantic_cache.embed(query)
+        cached_response = semantic_cache.get(query_vector, semantic_scope)
+        if cached_response is not None:
+            logger.info("Serving semantically cached response")
+            cache_hits_total.inc(cache="semantic")
+            return cached_response + create_engagement_footer(), None
+    
+    # Build location-aware prompt
+    prompt = f"""You are a helpful farming advisor. Give practical crop recommendations.
 
 Available Data: {truncated_context}
 
@@ -283,82 +381,213 @@ Location: {farm_location}
 
 Keep it encouraging and actionable."""
 
-        # API request
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "model": "llama3-8b-8192",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a friendly farming advisor. Always provide helpful crop recommendations based on the available data. Use simple language and be encouraging."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000,
-            "top_p": 0.9
-        }
-
-        logger.info(f"Making API request for {requested_crops} crops (Location: {user_location if user_location else 'General'})")
-        
-        response = requests.post(
-            GROQ_BASE_URL,
-            headers=headers,
-            json=data,
-            timeout=45
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"API error: {response.status_code}")
-            return "🔧 <strong>Service temporarily unavailable.</strong> Please try again in a moment."
-        
-        result = response.json()
-        
-        if not result.get('choices') or not result['choices']:
-            logger.error("Invalid API response structure")
-            return "⚠️ <strong>Invalid response received.</strong> Please try again."
-        
-        llm_response = result['choices'][0]['message']['content'].strip()
-        
-        if not llm_response:
-            return "❓ <strong>Empty response received.</strong> Please rephrase your question."
-        
-        # Format response
-        formatted_response = format_response_for_html(llm_response)
-        response_note = create_response_note(user_location, match_type)
-        engagement_footer = create_engagement_footer()
-        
-        final_response = formatted_response + response_note + engagement_footer
-        
-        logger.info("Successfully processed request")
-        return final_response
+    # API request
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a friendly farming advisor. Always provide helpful crop recommendations based on the available data. Use simple language and be encouraging."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": GROQ_TEMPERATURE,
+        "max_tokens": GROQ_MAX_TOKENS,
+        "top_p": 0.9
+    }
+
+    return None, LLMRequest(query, payload, user_location, match_type, requested_crops, cache_key,
+                            query_vector=query_vector, semantic_scope=semantic_scope, priority=priority)
 
-    except requests.exceptions.Timeout:
+def complete_llm_response(llm_request, formatted_response):
+    """Add the location note to a formatted answer and remember it in the caches"""
+    answer = formatted_response + create_response_note(llm_request.user_location, llm_request.match_type)
+    
+    if response_cache is not None:
+        response_cache.set(llm_request.cache_key, answer)
+    if semantic_cache is not None:
+        semantic_cache.set(llm_request.query_vector, llm_request.semantic_scope, answer)
+    
+    return answer
+
+def upstream_error_message(status_code):
+    """User-facing message for a non-200 status from the LLM API"""
+    logger.error(f"API error: {status_code}")
+    upstream_errors_total.inc(status=status_code)
+    if status_code == 413:
+        return QUERY_TOO_LONG_REPLY
+    elif status_code == 429:
+        return "⏰ <strong>Too many requests.</strong> Please wait a minute and try again."
+    return "🔧 <strong>Service temporarily unavailable.</strong> Please try again in a moment."
+
+def request_error_message(error):
+    """User-facing message for an exception raised while calling the LLM"""
+    if isinstance(error, SchedulerBusyError):
+        return BUSY_REPLY
+    
+    if isinstance(error, CircuitOpenError):
+        logger.error("LLM upstream unavailable, failing fast")
+        upstream_errors_total.inc(status="circuit_open")
+        return "🔧 <strong>Service temporarily unavailable.</strong> Please try again in a moment."
+    
+    if isinstance(error, requests.exceptions.Timeout):
         logger.error("Request timeout")
+        upstream_errors_total.inc(status="timeout")
         return "🕐 <strong>Request timed out.</strong> Please try a shorter question."
     
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else 0
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = error.response.status_code if error.response else 0
         logger.error(f"HTTP error: {status_code}")
+        upstream_errors_total.inc(status=status_code)
         
         if status_code == 413:
-            return "📝 <strong>Question too long.</strong> Please ask something shorter."
+            return QUERY_TOO_LONG_REPLY
         elif status_code == 429:
             return "⏰ <strong>Too many requests.</strong> Please wait a minute and try again."
         else:
             return "🔧 <strong>Service error.</strong> Please try again later."
     
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
+    if isinstance(error, requests.exceptions.RequestException):
+        logger.error(f"Request error: {str(error)}")
+        upstream_errors_total.inc(status="connection")
         return "📡 <strong>Connection error.</strong> Please check your internet connection."
     
+    logger.error(f"Unexpected error: {str(error)}")
+    return "⚠️ <strong>Something went wrong.</strong> Please try again or contact support."
+
+def retry_admission(llm_request):
+    """Return the admit_retry hook that counts an LLM call's retries against the requests-per-minute quota
+
+    The call's token reservation already covers its retries: failed attempts use no tokens.
+    """
+    return lambda: llm_scheduler.admit(0, llm_request.priority)
+
+def fetch_llm_answer(llm_request):
+    """Call the LLM for a prepared request
+
+    Returns (answer, None) with the formatted answer (without footer), or
+    (None, error message) when the upstream response is unusable.
+    """
+    logger.info(f"Making API request for {llm_request.requested_crops} crops (Location: {llm_request.user_location if llm_request.user_location else 'General'})")
+    
+    llm_scheduler.admit(llm_request.tokens, llm_request.priority)
+    
+    used = 0
+    try:
+        started = time.perf_counter()
+        response = get_llm_client().post(llm_request.payload, admit_retry=retry_admission(llm_request))
+        # elapsed runs from sending the (last) attempt until its headers arrived
+        stage_seconds.observe(response.elapsed.total_seconds(), stage="llm_first_byte")
+        stage_seconds.observe(time.perf_counter() - started, stage="llm_total")
+        
+        if response.status_code != 200:
+            return None, upstream_error_message(response.status_code)
+        
+        result = response.json()
+        record_usage(result)
+        used = (result.get('usage') or {}).get('total_tokens')
+    finally:
+        # Failed calls give back their whole reservation
+        llm_scheduler.settle(llm_request.tokens, used)
+    
+    if not result.get('choices') or not result['choices']:
+        logger.error("Invalid API response structure")
+        return None, "⚠️ <strong>Invalid response received.</strong> Please try again."
+    
+    llm_response = result['choices'][0]['message']['content'].strip()
+    
+    if not llm_response:
+        return None, "❓ <strong>Empty response received.</strong> Please rephrase your question."
+    
+    # Format response
+    with stage_seconds.time(stage="formatting"):
+        formatted_response = format_response_for_html(llm_response)
+    return complete_llm_response(llm_request, formatted_response), None
+
+def generate_llm_answer(llm_request):
+    """Answer a prepared request through the LLM, returning the reply with its footer"""
+    try:
+        # Identical concurrent questions share one upstream call
+        answer, error_message = llm_flight.do(llm_request.cache_key, lambda: fetch_llm_answer(llm_request))
+        if error_message:
+            return error_message
+        
+        logger.info("Successfully processed request")
+        return answer + create_engagement_footer()
+
+    except Exception as e:
+        return request_error_message(e)
+
+def settle_stream_usage(llm_request, usage, streamed_text):
+    """Record a streamed answer's usage and refund its unused token reservation
+
+    usage is None when the call failed before streaming, which gives the whole
+    reservation back. Without a usage chunk (the stream was cut short, or the
+    upstream doesn't send one), the usage is estimated from the prompt and the
+    text streamed so far.
+    """
+    if usage is None:
+        used = 0
+    elif usage.get('total_tokens'):
+        record_usage({'usage': usage})
+        used = usage['total_tokens']
+    else:
+        prompt_tokens = llm_request.tokens - llm_request.payload.get('max_tokens', 0)
+        used = prompt_tokens + count_tokens(streamed_text)
+    llm_scheduler.settle(llm_request.tokens, used)
+
+def stream_llm_answer(llm_request):
+    """Yield the answer to a prepared request in HTML chunks as the LLM generates it"""
+    try:
+        logger.info(f"Making streaming API request for {llm_request.requested_crops} crops (Location: {llm_request.user_location if llm_request.user_location else 'General'})")
+        
+        llm_scheduler.admit(llm_request.tokens, llm_request.priority)
+        usage = None
+        deltas = []
+        try:
+            started = time.perf_counter()
+            payload = dict(llm_request.payload, stream=True, stream_options={"include_usage": True})
+            response = get_llm_client().post(payload, admit_retry=retry_admission(llm_request), stream=True)
+            stage_seconds.observe(response.elapsed.total_seconds(), stage="llm_first_byte")
+            
+            with response:
+                if response.status_code != 200:
+                    yield upstream_error_message(response.status_code)
+                    return
+                
+                formatter = StreamingHTMLFormatter()
+                formatted_parts = []
+                usage = {}
+                for delta in iter_stream_deltas(response.iter_lines(decode_unicode=True), usage):
+                    deltas.append(delta)
+                    if not formatted_parts and not delta.strip():
+                        continue  # Skip leading whitespace, like the non-streaming path
+                    chunk = formatter.feed(delta)
+                    formatted_parts.append(chunk)
+                    if chunk:
+                        yield chunk
+                
+                chunk = formatter.close()
+                formatted_parts.append(chunk)
+                if chunk:
+                    yield chunk
+        finally:
+            # Also runs when the call fails or the client disconnects mid-stream
+            settle_stream_usage(llm_request, usage, ''.join(deltas))
+        stage_seconds.observe(time.perf_counter() - started, stage="llm_total")
+        
+        formatted_response = ''.join(formatted_parts)
+        if not formatted_response.strip():
+            yield "❓ <strong>Empty response received.</strong> Please rephrase your question."
+            return
+        
+        answer = complete_llm_response(llm_request, formatted_response)
+        yield answer[len(formatted_response):] + create_engagement_footer()
+        
+        logger.info("Successfully streamed request")
+
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        return "⚠️ <strong>Something went wrong.</strong> Please try again or contact support."
\ No newline at end of file
+        yield request_error_message(e)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import re
+from collections import defaultdict
+
+# States and union territories; multi-word names are matched as a whole
+INDIAN_STATES = [
+    'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar', 'Chhattisgarh', 'Goa', 'Gujarat',
+    'Haryana', 'Himachal Pradesh', 'Jharkhand', 'Karnataka', 'Kerala', 'Madhya Pradesh',
+    'Maharashtra', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland', 'Odisha', 'Punjab',
+    'Rajasthan', 'Sikkim', 'Tamil Nadu', 'Telangana', 'Tripura', 'Uttar Pradesh',
+    'Uttarakhand', 'West Bengal', 'Delhi', 'Jammu and Kashmir', 'Ladakh', 'Puducherry',
+    'Chandigarh', 'Andaman and Nicobar Islands', 'Lakshadweep',
+    'Dadra and Nagar Haveli and Daman and Diu'
+]
+
+_STATE_PATTERN = '|'.join(re.escape(state) for state in sorted(INDIAN_STATES, key=len, reverse=True))
+STATE_MENTION = re.compile(rf'\b({_STATE_PATTERN})\b', re.IGNORECASE)
+# "Guntur, Andhra Pradesh", "Guntur (Andhra Pradesh)", "Guntur - Andhra Pradesh"
+CITY_IN_STATE = re.compile(rf'\b([A-Z][a-zA-Z]+(?: [A-Z][a-zA-Z]+)?)\s*(?:,|\(|-)\s*({_STATE_PATTERN})\b')
+TOKEN_PATTERN = re.compile(r'[a-z]+')
+
+CITY_BOOST = 2.0
+STATE_BOOST = 1.0
+
+def place_key(name):
+    """Lookup key for a place name: lowercase words joined by single spaces"""
+    return ' '.join(TOKEN_PATTERN.findall(name.lower()))
+
+def build_gazetteer(database):
+    """Collect the cities and states mentioned in the corpus, with the documents mentioning them"""
+    canonical_states = {place_key(state): state for state in INDIAN_STATES}
+    places = {}
+    docs = defaultdict(set)
+
+    for doc_id, doc in enumerate(database):
+        # Chunks carry their section title separately ("Maharashtra Crop Data")
+        text = doc.get('title', '') + '\n' + doc['full_text']
+
+        for match in STATE_MENTION.finditer(text):
+            key = place_key(match.group(1))
+            places.setdefault(key, {'name': canonical_states[key], 'kind': 'state', 'state': None})
+            docs[key].add(doc_id)
+
+        for match in CITY_IN_STATE.finditer(text):
+            city, state = match.group(1), canonical_states[place_key(match.group(2))]
+            key = place_key(city)
+            if key in canonical_states:
+                continue
+            places.setdefault(key, {'name': city, 'kind': 'city', 'state': state})
+            docs[key].add(doc_id)
+
+    for key, place in places.items():
+        place['docs'] = sorted(docs[key])
+    return {'places': places}
+
+class Place:
+    __slots__ = ('name', 'kind', 'state', 'doc_ids')
+
+    def __init__(self, name, kind, state, doc_ids):
+        self.name = name
+        self.kind = kind
+        self.state = state
+        self.doc_ids = doc_ids
+
+class LocationResolver:
+    """Resolves place names in a query to canonical gazetteer entries with dictionary lookups"""
+
+    def __init__(self, gazetteer):
+        self.places = {
+            key: Place(entry['name'], entry['kind'], entry.get('state'), tuple(entry.get('docs', ())))
+            for key, entry in gazetteer.get('places', {}).items()
+        }
+        self.max_words = max((len(key.split()) for key in self.places), default=1)
+
+    def resolve(self, text):
+        """Return the places mentioned in text, longest names first ("tamil nadu" before "nadu")"""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        found = []
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.max_words, len(tokens) - i), 0, -1):
+                place = self.places.get(' '.join(tokens[i:i + size]))
+                if place is not None:
+                    if place not in found:
+                        found.append(place)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def state_of(self, place):
+        """Roll a city up to its state entry, if the corpus has one"""
+        if place.kind == 'state' or not place.state:
+            return None
+        return self.places.get(place_key(place.state))
+
+    def document_boosts(self, places):
+        """Score bonus per document for the regions mentioned in a query"""
+        boosts = {}
+        for place in places:
+            for doc_id in place.doc_ids:
+                boosts[doc_id] = max(boosts.get(doc_id, 0.0), CITY_BOOST if place.kind == 'city' else STATE_BOOST)
+            state = self.state_of(place)
+            if state is not None:
+                for doc_id in state.doc_ids:
+                    boosts[doc_id] = max(boosts.get(doc_id, 0.0), STATE_BOOST)
+        return boosts
@@ -0,0 +1,160 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; stages range from microseconds (analysis) to tens of seconds (LLM)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Latency histogram with fixed buckets; observe() is a bisect and three additions under a lock"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    "agri_requests_total", "Chat requests received", ("endpoint",)))
+request_seconds = registry.register(Histogram(
+    "agri_request_seconds", "End-to-end chat request latency", ("endpoint",)))
+# Stages: validation, analysis, direct_answer, retrieval, prompt, llm_connect, llm_first_byte, llm_total, formatting
+stage_seconds = registry.register(Histogram(
+    "agri_stage_seconds", "Latency of each chat pipeline stage", ("stage",)))
+cache_hits_total = registry.register(Counter(
+    "agri_cache_hits_total", "Answers or contexts served from a cache", ("cache",)))
+upstream_errors_total = registry.register(Counter(
+    "agri_upstream_errors_total", "Failed LLM calls by HTTP status or error kind", ("status",)))
+pipeline_exits_total = registry.register(Counter(
+    "agri_pipeline_exits_total", "Chat queries answered before the LLM call, by the stage that answered", ("stage",)))
+llm_tokens_total = registry.register(Counter(
+    "agri_llm_tokens_total", "Tokens reported in the LLM API usage field", ("kind",)))
+
+llm_queue_depth = registry.register(Gauge(
+    "agri_llm_queue_depth", "LLM calls waiting for admission, by priority", ("priority",)))
+llm_queue_wait_seconds = registry.register(Histogram(
+    "agri_llm_queue_wait_seconds", "Time LLM calls waited for admission", ("priority",)))
+llm_shed_total = registry.register(Counter(
+    "agri_llm_shed_total", "LLM calls turned away by the scheduler, by priority and reason",
+    ("priority", "reason")))
+
+def record_usage(result):
+    """Count prompt and completion tokens from a chat completion's usage field"""
+    usage = result.get('usage') or {}
+    if usage.get('prompt_tokens'):
+        llm_tokens_total.inc(usage['prompt_tokens'], kind="prompt")
+    if usage.get('completion_tokens'):
+        llm_tokens_total.inc(usage['completion_tokens'], kind="completion")
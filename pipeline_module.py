@@ -0,0 +1,110 @@
+import logging
+import os
+import re
+
+from llm_module import (
+    CONFIG_ERROR_REPLY, GROQ_API_KEY, INVALID_QUERY_REPLY, OFF_TOPIC_REPLY, QUERY_TOO_LONG_REPLY,
+    create_engagement_footer, generate_llm_answer, prepare_llm_request
+)
+from metrics_module import pipeline_exits_total, stage_seconds
+from query_module import analyze_query
+from rag_module import get_context_from_query, get_direct_answer
+from scheduler_module import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+# Longer queries are rejected before analysis; real questions are a sentence or two
+MAX_QUERY_CHARS = int(os.getenv("MAX_QUERY_CHARS", "1000"))
+NO_CONTEXT = "No specific crop data found. Please provide general farming guidance."
+
+LETTER_PATTERN = re.compile(r'[a-zA-Z]')
+# Links, markup and long runs of one letter are bots or spam, never crop questions; runs of
+# spaces, dashes or dots are allowed, they come from tables and forms pasted into questions
+SPAM_PATTERN = re.compile(r'https?://|www\.|<\s*/?\s*[a-zA-Z][^>]*>|([a-zA-Z])\1{9,}')
+
+class ChatTurn:
+    """One chat query on its way through the pipeline
+
+    Each stage fills in its output (analysis, context, llm_request) for the later
+    stages to reuse. A stage that can already answer sets reply and the pipeline
+    stops there; exit_stage names that stage. priority orders the LLM call in the
+    scheduler's queue.
+    """
+
+    __slots__ = ('query', 'priority', 'analysis', 'context', 'llm_request', 'reply', 'exit_stage')
+
+    def __init__(self, query, priority=INTERACTIVE):
+        self.query = query
+        self.priority = priority
+        self.analysis = None
+        self.context = None
+        self.llm_request = None
+        self.reply = None
+        self.exit_stage = None
+
+def validate(turn):
+    """Reject oversized, letterless and spam queries with string checks only"""
+    with stage_seconds.time(stage="validation"):
+        query = turn.query
+        if len(query) > MAX_QUERY_CHARS:
+            return QUERY_TOO_LONG_REPLY
+        if not LETTER_PATTERN.search(query):
+            return INVALID_QUERY_REPLY
+        if SPAM_PATTERN.search(query):
+            return OFF_TOPIC_REPLY
+    return None
+
+def classify(turn):
+    """Analyze the query, turn away off-topic ones and answer table lookups"""
+    with stage_seconds.time(stage="analysis"):
+        turn.analysis = analyze_query(turn.query)
+    if not turn.analysis.is_agriculture:
+        return OFF_TOPIC_REPLY
+
+    # Simple lookups are answered straight from the crop table
+    with stage_seconds.time(stage="direct_answer"):
+        direct_answer = get_direct_answer(turn.query, turn.analysis)
+    if direct_answer:
+        return direct_answer + create_engagement_footer()
+
+    # Everything past this point needs the LLM
+    if not GROQ_API_KEY:
+        return CONFIG_ERROR_REPLY
+    return None
+
+def retrieve(turn):
+    """Retrieve context for the query, falling back to a general-guidance placeholder"""
+    with stage_seconds.time(stage="retrieval"):
+        turn.context = get_context_from_query(turn.query, analysis=turn.analysis)
+    if not turn.context:
+        logger.warning("No relevant context found for query")
+        turn.context = NO_CONTEXT
+    return None
+
+def build_prompt(turn):
+    """Build the LLM request; cached answers end the pipeline here"""
+    with stage_seconds.time(stage="prompt"):
+        reply, turn.llm_request = prepare_llm_request(turn.query, turn.context, turn.analysis, turn.priority)
+    return reply
+
+def generate(turn):
+    """Call the LLM and format its answer as HTML"""
+    return generate_llm_answer(turn.llm_request)
+
+# Stages up to the LLM call, and the LLM stages
+ANSWER_STAGES = (validate, classify, retrieve, build_prompt)
+LLM_STAGES = (build_prompt, generate)
+CHAT_STAGES = ANSWER_STAGES + (generate,)
+
+def run_pipeline(turn, stages=CHAT_STAGES):
+    """Run stages in order until one of them produces the reply; returns the turn"""
+    for stage in stages:
+        reply = stage(turn)
+        if reply is not None:
+            turn.reply = reply
+            turn.exit_stage = stage.__name__
+            if stage is not generate:
+                pipeline_exits_total.inc(stage=turn.exit_stage)
+                logger.info(f"Answered at the {turn.exit_stage} stage: {turn.query[:100]}")
+            break
+    return turn
@@ -1,64 +1,415 @@
+import argparse
+import hashlib
+import heapq
 import json
 import os
 import logging
 import re
-from collections import defaultdict
+import sys
+import tempfile
+import time
+from bisect import insort
+from collections import defaultdict, deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+from fuzzy_module import build_trigram_index
+from location_module import build_gazetteer
+from table_module import build_crop_table
+from token_module import count_tokens
+from binary_index_module import BINARY_INDEX_FILE, MANIFEST_FILE, BinaryIndex, write_binary_index
+from semantic_cache_module import DEFAULT_EMBEDDING_MODEL
+from vector_module import EMBEDDING_DTYPES, remove_embedding_index, write_embedding_index
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_simple_database():
-    """Create a simple keyword-based database without embeddings"""
+DATA_FILE = "crop_recommendation_rag_text.txt"
+DB_DIR = "simple_db"
+# Section hashes and chunk ranges of the last build, used to rebuild incrementally
+MANIFEST_VERSION = 1
+# Sections per task sent to a build worker
+BUILD_BATCH_SECTIONS = 256
+
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+
+def iter_source_files(inputs):
+    """Expand the input paths into data files; directories contribute their *.txt files in name order"""
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.txt') and os.path.isfile(os.path.join(path, name)):
+                    yield os.path.join(path, name)
+        elif os.path.exists(path):
+            yield path
+        else:
+            raise FileNotFoundError(f"Data file '{path}' not found.")
+
+def iter_sections(paths):
+    """Stream (source, section) pairs, reading files line by line; sections are separated by blank lines"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = []
+            for line in f:
+                if line.strip():
+                    lines.append(line.rstrip('\n'))
+                elif lines:
+                    yield path, '\n'.join(lines).strip()
+                    lines = []
+            if lines:
+                yield path, '\n'.join(lines).strip()
+
+def section_hash(section):
+    return hashlib.sha1(section.encode('utf-8')).hexdigest()
+
+def chunk_section(section, parent, first_id):
+    """Split a section into one chunk per line, pointing back at the section so retrieval can regroup them"""
+    lines = section.split('\n')
+    if len(lines) > 1:
+        title = lines[0]
+        chunk_lines = [line for line in lines[1:] if line.strip()]
+    else:
+        title = ""
+        chunk_lines = [section]
+
+    chunks = []
+    for line in chunk_lines:
+        # The section title is indexed with every line
+        words = WORD_PATTERN.findall((title + ' ' + line).lower())
+        chunks.append({
+            'id': first_id + len(chunks),
+            'parent': parent,
+            'title': title,
+            'content': line,
+            'full_text': line,
+            'length': len(words),  # Used for BM25 length normalisation
+            'tokens': count_tokens(line),  # Used for the context token budget
+            # Sorted like the binary index's terms, so every build path writes the same JSON
+            'term_freqs': dict(sorted(Counter(words).items()))
+        })
+    return chunks
+
+def write_json_atomic(path, data, **kwargs):
+    """Write JSON to a temporary file and rename it into place, so readers never see a partial file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+def load_previous_build(db_dir=DB_DIR):
+    """Return (manifest, database, keywords_index) of the last build, or None if there is nothing to reuse"""
+    try:
+        manifest_path = os.path.join(db_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+
+        if manifest.get('format') in ("json", "both"):
+            with open(os.path.join(db_dir, "database.json"), 'r', encoding='utf-8') as f:
+                database = json.load(f)
+            with open(os.path.join(db_dir, "keywords.json"), 'r', encoding='utf-8') as f:
+                keywords_index = json.load(f)
+        else:
+            # Binary-only builds: invert the stored postings to recover per-chunk term frequencies
+            index = BinaryIndex(os.path.join(db_dir, BINARY_INDEX_FILE))
+            database = [dict(doc, term_freqs={}) for doc in index.database]
+            keywords_index = {}
+            for term in index.keywords_index:
+                postings = index.postings(term)
+                keywords_index[term] = postings
+                for doc_id, freq in zip(postings, index.term_frequencies(term)):
+                    database[doc_id]['term_freqs'][term] = freq
+
+        if sum(section['count'] for section in manifest['sections']) != len(database):
+            logger.warning("Previous build doesn't match its manifest, rebuilding from scratch")
+            return None
+        return manifest, database, keywords_index
+
+    except Exception as e:
+        logger.warning(f"Can't reuse the previous build, rebuilding from scratch: {str(e)}")
+        return None
+
+def update_postings(keywords_index, old_database, id_map, removed, added_chunks):
+    """Apply a postings delta: drop removed chunks, renumber kept ones and add the new chunks"""
+    old_ids = sorted(id_map)
+    renumbered = any(id_map[old_id] != old_id for old_id in old_ids)
+
+    if renumbered:
+        # Every posting may move; the id map is applied in one pass, without re-tokenizing
+        reordered = any(id_map[a] > id_map[b] for a, b in zip(old_ids, old_ids[1:]))
+        terms = list(keywords_index)
+    else:
+        # Only the postings of terms in removed chunks change
+        reordered = False
+        terms = {term for doc_id in removed for term in old_database[doc_id]['term_freqs']}
+
+    for term in terms:
+        postings = [id_map[doc_id] for doc_id in keywords_index[term] if doc_id in id_map]
+        if reordered:
+            postings.sort()
+        if postings:
+            keywords_index[term] = postings
+        else:
+            del keywords_index[term]
+
+    for chunk in added_chunks:
+        for term in chunk['term_freqs']:
+            postings = keywords_index.setdefault(term, [])
+            if not postings or postings[-1] < chunk['id']:
+                postings.append(chunk['id'])
+            else:
+                insort(postings, chunk['id'])
+    return keywords_index
+
+def write_database(database, keywords_index, manifest_sections, output_format, db_dir=DB_DIR, embeddings=None):
+    """Write the index files, the derived indexes and finally the build manifest
+
+    embeddings is {'model': ..., 'dtype': ...} to also write the dense embedding index.
+    """
+    os.makedirs(db_dir, exist_ok=True)
+    # Until the new manifest is written, an interrupted build leaves no manifest and the next one starts over
+    if os.path.exists(os.path.join(db_dir, MANIFEST_FILE)):
+        os.remove(os.path.join(db_dir, MANIFEST_FILE))
+
+    if output_format in ("json", "both"):
+        write_json_atomic(os.path.join(db_dir, "database.json"), database, indent=2)
+        write_json_atomic(os.path.join(db_dir, "keywords.json"), keywords_index, indent=2, sort_keys=True)
+
+    if output_format in ("binary", "both"):
+        write_binary_index(database, keywords_index, os.path.join(db_dir, BINARY_INDEX_FILE))
+    elif os.path.exists(os.path.join(db_dir, BINARY_INDEX_FILE)):
+        # A stale binary index would shadow the freshly written JSON files
+        os.remove(os.path.join(db_dir, BINARY_INDEX_FILE))
+
+    # Trigram index over the vocabulary for fuzzy keyword lookups
+    write_json_atomic(os.path.join(db_dir, "trigrams.json"), build_trigram_index(keywords_index))
+
+    # Gazetteer of the cities and states in the corpus for location lookups
+    write_json_atomic(os.path.join(db_dir, "locations.json"), build_gazetteer(database))
+
+    # Typed crop table (location, soil, rainfall, temperature, irrigation, crops) for direct answers
+    crop_table = build_crop_table(database)
+    write_json_atomic(os.path.join(db_dir, "crop_table.json"), crop_table)
+    logger.info(f"Extracted {len(crop_table['crops'])} crop table rows")
+
+    # Optional dense index for hybrid keyword + vector retrieval
+    if embeddings:
+        write_embedding_index(database, db_dir, embeddings['model'], embeddings['dtype'])
+    else:
+        remove_embedding_index(db_dir)
+
+    # Written last, once every index file is in place; the server reloads only when it changes
+    write_json_atomic(os.path.join(db_dir, MANIFEST_FILE), {
+        'version': MANIFEST_VERSION,
+        'format': output_format,
+        'embeddings': embeddings,
+        'sections': manifest_sections
+    })
+
+def build_incremental(paths, previous):
+    """Rebuild from the previous build, tokenizing only new or changed sections
+
+    Returns (database, keywords_index, manifest_sections, changed).
+    """
+    if previous:
+        old_manifest, old_database, keywords_index = previous
+    else:
+        old_manifest, old_database, keywords_index = {'sections': []}, [], {}
+
+    # Unchanged sections keep their chunks; repeated sections are matched one to one
+    old_sections = defaultdict(list)
+    for section in old_manifest['sections']:
+        old_sections[section['hash']].append(section)
+
+    database = []
+    manifest_sections = []
+    id_map = {}  # old chunk id -> new chunk id, for reused chunks
+    added_chunks = []
+
+    for parent, (source, section) in enumerate(iter_sections(paths)):
+        digest = section_hash(section)
+        first_id = len(database)
+        reused = old_sections[digest].pop(0) if old_sections.get(digest) else None
+
+        if reused:
+            for old_id in range(reused['first'], reused['first'] + reused['count']):
+                chunk = dict(old_database[old_id], id=len(database), parent=parent)
+                id_map[old_id] = chunk['id']
+                database.append(chunk)
+        else:
+            chunks = chunk_section(section, parent, first_id)
+            database.extend(chunks)
+            added_chunks.extend(chunks)
+
+        manifest_sections.append({
+            'hash': digest,
+            'source': source,
+            'first': first_id,
+            'count': len(database) - first_id
+        })
+
+    removed = [old_id for old_id in range(len(old_database)) if old_id not in id_map]
+    logger.info(
+        f"Found {len(manifest_sections)} sections in {len(database)} chunks: "
+        f"{len(added_chunks)} tokenized, {len(id_map)} reused, {len(removed)} removed"
+    )
+
+    changed = bool(added_chunks or removed) or any(old != new for old, new in id_map.items())
+    if changed:
+        keywords_index = update_postings(keywords_index, old_database, id_map, removed, added_chunks)
+    return database, keywords_index, manifest_sections, changed
+
+def iter_section_batches(paths, batch_size):
+    batch = []
+    for item in iter_sections(paths):
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def tokenize_batch(batch, first_parent, run_path):
+    """Worker: chunk a batch of sections and spill its partial inverted index, sorted by term, to run_path
+
+    Chunk ids are local to the batch; the parent shifts them once the earlier batches are counted.
+    """
+    chunks = []
+    sections = []
+    for n, (source, section) in enumerate(batch):
+        section_chunks = chunk_section(section, first_parent + n, len(chunks))
+        sections.append({
+            'hash': section_hash(section),
+            'source': source,
+            'first': len(chunks),
+            'count': len(section_chunks)
+        })
+        chunks.extend(section_chunks)
+
+    postings = defaultdict(list)
+    for chunk in chunks:
+        for term in chunk['term_freqs']:
+            postings[term].append(chunk['id'])
+    with open(run_path, 'w', encoding='utf-8') as f:
+        for term in sorted(postings):
+            f.write(json.dumps([term, postings[term]], ensure_ascii=False) + '\n')
+    return chunks, sections
+
+def iter_run(run_path, offset):
+    with open(run_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            term, postings = json.loads(line)
+            yield term, [doc_id + offset for doc_id in postings]
+
+def merge_runs(runs):
+    """k-way merge of the partial indexes; runs are in chunk id order, so merged postings stay sorted"""
+    keywords_index = {}
+    # heapq.merge is stable: equal terms come out in run order
+    for term, postings in heapq.merge(*(iter_run(path, offset) for path, offset in runs), key=lambda item: item[0]):
+        keywords_index.setdefault(term, []).extend(postings)
+    return keywords_index
+
+def build_parallel(paths, workers, batch_size=BUILD_BATCH_SECTIONS):
+    """Tokenize sections on a process pool and k-way merge the partial indexes the workers spill to disk
+
+    Sections are streamed from the inputs; at most 2 * workers batches are in
+    flight, so memory holds the chunks plus a bounded window of raw sections.
+    Returns (database, keywords_index, manifest_sections).
+    """
+    database = []
+    manifest_sections = []
+    runs = []  # (run file, chunk id offset)
+    pending = deque()
+
+    def collect():
+        future, run_path = pending.popleft()
+        chunks, sections = future.result()
+        offset = len(database)
+        for chunk in chunks:
+            chunk['id'] += offset
+        for section in sections:
+            section['first'] += offset
+        database.extend(chunks)
+        manifest_sections.extend(sections)
+        runs.append((run_path, offset))
+
+    with tempfile.TemporaryDirectory(prefix="agri-build-") as run_dir:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            num_sections = 0
+            for n, batch in enumerate(iter_section_batches(paths, batch_size)):
+                run_path = os.path.join(run_dir, f"run-{n:06d}.jsonl")
+                pending.append((executor.submit(tokenize_batch, batch, num_sections, run_path), run_path))
+                num_sections += len(batch)
+                while len(pending) >= workers * 2:
+                    collect()
+            while pending:
+                collect()
+
+        keywords_index = merge_runs(runs)
+
+    logger.info(f"Found {len(manifest_sections)} sections in {len(database)} chunks ({len(runs)} runs merged)")
+    return database, keywords_index, manifest_sections
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of its largest finished child, in MB"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, children
+
+def log_build_stats(paths, num_sections, elapsed):
+    input_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+    elapsed = max(elapsed, 1e-9)
+    own_rss, worker_rss = peak_rss_mb()
+    rss = f", peak RSS {own_rss:.1f} MB (workers {worker_rss:.1f} MB)" if own_rss is not None else ""
+    logger.info(
+        f"Built {num_sections} sections ({input_mb:.2f} MB) in {elapsed:.2f}s: "
+        f"{num_sections / elapsed:.0f} sections/sec, {input_mb / elapsed:.2f} MB/sec{rss}"
+    )
+
+def create_simple_database(inputs=None, output_format="both", full_rebuild=False, db_dir=DB_DIR, workers=1,
+                           embedding_model=None, embedding_dtype="float32"):
+    """Create a simple keyword-based database without embeddings
+
+    inputs are data files or directories of .txt files (default: the crop
+    recommendation text). Builds are incremental: sections are content-hashed, only
+    new or changed ones are tokenized and sections no longer in the inputs are
+    deleted. With workers > 1, full builds tokenize on a process pool. output_format
+    is "json" (database.json/keywords.json), "binary" (memory-mapped index.bin) or
+    "both"; the retriever serves from index.bin when it exists. With
+    embedding_model (a model name or local directory), chunk embeddings are also
+    written for hybrid search. Every file is written under a temporary name and
+    renamed into place.
+    """
     try:
-        # Check if the data file exists
-        data_file = "crop_recommendation_rag_text.txt"
-        if not os.path.exists(data_file):
-            raise FileNotFoundError(f"Data file '{data_file}' not found.")
-        
-        logger.info(f"Loading data from {data_file}")
-        
-        # Read the text file
-        with open(data_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Split content into sections
-        sections = [section.strip() for section in content.split('\n\n') if section.strip()]
-        
-        logger.info(f"Found {len(sections)} sections")
-        
-        # Create database structure
-        database = []
-        keywords_index = defaultdict(list)
-        
-        for i, section in enumerate(sections):
-            lines = section.split('\n')
-            title = lines[0] if lines else f"Section {i+1}"
-            content_text = '\n'.join(lines[1:]) if len(lines) > 1 else section
-            
-            doc = {
-                'id': i,
-                'title': title,
-                'content': content_text,
-                'full_text': section
-            }
-            database.append(doc)
-            
-            # Create keyword index
-            text_for_keywords = (title + ' ' + content_text).lower()
-            words = re.findall(r'\b[a-zA-Z]{3,}\b', text_for_keywords)
-            
-            for word in set(words):
-                keywords_index[word].append(i)
-        
-        # Save the database
-        os.makedirs("simple_db", exist_ok=True)
-        
-        with open("simple_db/database.json", "w", encoding='utf-8') as f:
-            json.dump(database, f, indent=2, ensure_ascii=False)
-        
-        with open("simple_db/keywords.json", "w", encoding='utf-8') as f:
-            json.dump(dict(keywords_index), f, indent=2, ensure_ascii=False)
-        
+        started = time.perf_counter()
+        paths = list(iter_source_files(inputs or [DATA_FILE]))
+        logger.info(f"Loading data from {', '.join(paths)}")
+
+        embeddings = {'model': embedding_model, 'dtype': embedding_dtype} if embedding_model else None
+        previous = None if full_rebuild else load_previous_build(db_dir)
+        if workers > 1 and not previous:
+            database, keywords_index, manifest_sections = build_parallel(paths, workers)
+        else:
+            database, keywords_index, manifest_sections, changed = build_incremental(paths, previous)
+            same_outputs = previous and previous[0].get('format') == output_format \
+                and previous[0].get('embeddings') == embeddings
+            if same_outputs and not changed:
+                logger.info("✅ Database is already up to date")
+                return True
+
+        write_database(database, keywords_index, manifest_sections, output_format, db_dir, embeddings)
+        log_build_stats(paths, len(manifest_sections), time.perf_counter() - started)
+
         logger.info("✅ Simple database created successfully")
         return True
 
@@ -67,10 +418,31 @@ def create_simple_database():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the crop recommendation database")
+    parser.add_argument("inputs", nargs="*", default=[DATA_FILE],
+                        help=f"data files or directories of .txt files (default: {DATA_FILE})")
+    parser.add_argument("--format", choices=["json", "binary", "both"], default="both",
+                        help="index format(s) to write (default: both)")
+    parser.add_argument("--full", action="store_true",
+                        help="re-tokenize every section instead of only new or changed ones")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="tokenize full builds on this many processes (default: 1)")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="also build the dense embedding index for hybrid search")
+    parser.add_argument("--embedding-model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+                        help="sentence-transformers model name or local model directory")
+    parser.add_argument("--embedding-dtype", choices=EMBEDDING_DTYPES, default="float32",
+                        help="store embeddings as float32 or int8-quantized (default: float32)")
+    args = parser.parse_args()
+
     print("🌾 Creating simple crop recommendation database...")
-    
-    success = create_simple_database()
-    
+
+    success = create_simple_database(
+        args.inputs, args.format, args.full, workers=args.workers,
+        embedding_model=args.embedding_model if args.embeddings else None,
+        embedding_dtype=args.embedding_dtype
+    )
+
     if success:
         print("✅ Setup completed successfully!")
         print("📁 Database saved in 'simple_db' directory")
@@ -0,0 +1,178 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+# Agriculture-related keywords
+AGRICULTURE_KEYWORDS = [
+    'crop', 'crops', 'farming', 'farm', 'agriculture', 'agricultural', 'plant', 'planting',
+    'grow', 'growing', 'harvest', 'field', 'soil', 'seed', 'seeds', 'fertilizer',
+    'irrigation', 'cultivation', 'cultivate', 'yield', 'production', 'farmer',
+    'wheat', 'rice', 'corn', 'maize', 'sugarcane', 'cotton', 'vegetable', 'fruit',
+    'season', 'monsoon', 'kharif', 'rabi', 'zaid', 'sowing', 'reaping',
+    'pesticide', 'herbicide', 'organic', 'profit', 'income', 'market', 'price',
+    'climate', 'weather', 'rain', 'drought', 'water', 'land', 'acre', 'hectare'
+]
+
+# Agriculture-related phrases
+AGRICULTURE_PHRASES = [
+    'what to grow', 'which crop', 'best for farming', 'agricultural advice',
+    'farming tips', 'crop recommendation', 'suitable for cultivation',
+    'high yield', 'profitable crops', 'cash crops', 'food crops'
+]
+
+SEASON_KEYWORDS = ['kharif', 'rabi', 'zaid', 'monsoon', 'summer', 'winter', 'spring', 'autumn']
+
+FEW_WORDS = ['few', 'some', 'several']
+MANY_WORDS = ['many', 'multiple', 'various']
+
+NUMBER_MAP = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+DEFAULT_CROP_COUNT = 4
+MAX_CROP_COUNT = 8
+
+# Look for explicit location mentions with keywords, in priority order
+LOCATION_PATTERNS = [
+    re.compile(rf'\b{preposition}\s+([a-zA-Z\s]+?)(?:\s|$|,|\?)')
+    for preposition in ('in', 'from', 'at', 'near', 'around', 'for')
+]
+LOCATION_STOPWORDS = re.compile(r'\b(my|area|region|place|farm|field|growing|crops|agriculture)\b', re.IGNORECASE)
+NON_WORD_CHARS = re.compile(r'[^\w\s]')
+NON_LOCATIONS = {'summer', 'winter', 'monsoon', 'season'}
+# Words that mean a preposition phrase is about farming, not a place ("for monsoon rice")
+NON_LOCATION_WORDS = frozenset(AGRICULTURE_KEYWORDS + SEASON_KEYWORDS)
+
+# Numbers that are measurements ("500 mm", "30°C") are not crop counts
+NUMBER_PATTERN = re.compile(r'\b(one|two|three|four|five|six|seven|eight|nine|ten|\d+)\b(?!\s*(?:mm\b|cm\b|°|degrees?\b|deg\b))')
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every pattern occurring as a substring in one pass over the text"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern)
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """Return the set of patterns that occur in text"""
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+# Gazetteer built from the corpus; installed by the retriever whenever it loads an index
+_location_resolver = None
+
+def set_location_resolver(resolver):
+    """Resolve locations through the given gazetteer from now on"""
+    global _location_resolver
+    if resolver is not _location_resolver:
+        _location_resolver = resolver
+        analyze_query.cache_clear()
+
+_automaton = KeywordAutomaton(set(AGRICULTURE_KEYWORDS + AGRICULTURE_PHRASES + SEASON_KEYWORDS + FEW_WORDS + MANY_WORDS))
+_agriculture_patterns = frozenset(AGRICULTURE_KEYWORDS + AGRICULTURE_PHRASES)
+
+class QueryAnalysis:
+    """Everything retrieval and prompt building need to know about a query"""
+
+    __slots__ = ('query', 'query_lower', 'words', 'is_agriculture', 'location', 'places', 'crop_count', 'seasons')
+
+    def __init__(self, query, query_lower, words, is_agriculture, location, places, crop_count, seasons):
+        self.query = query
+        self.query_lower = query_lower
+        self.words = words
+        self.is_agriculture = is_agriculture
+        self.location = location
+        self.places = places  # Gazetteer entries; empty if the location is unknown to the corpus
+        self.crop_count = crop_count
+        self.seasons = seasons
+
+def _find_location(query_lower):
+    for pattern in LOCATION_PATTERNS:
+        for match in pattern.findall(query_lower):
+            # Remove common non-location words
+            location = LOCATION_STOPWORDS.sub('', match.strip()).strip()
+            # Clean up and check if it looks like a real location
+            location = NON_WORD_CHARS.sub('', location).strip().title()
+            if location and len(location) > 2 and location.lower() not in NON_LOCATIONS:
+                if NON_LOCATION_WORDS.isdisjoint(location.lower().split()):
+                    return location
+    return None
+
+def _find_crop_count(query_lower, matched):
+    for num in NUMBER_PATTERN.findall(query_lower):
+        if num.isdigit():
+            return min(int(num), MAX_CROP_COUNT)
+        return NUMBER_MAP[num]
+
+    # Default based on context
+    if not matched.isdisjoint(FEW_WORDS):
+        return 3
+    if not matched.isdisjoint(MANY_WORDS):
+        return 5
+    return DEFAULT_CROP_COUNT
+
+@lru_cache(maxsize=2048)
+def analyze_query(query):
+    """Analyze a query once: words for retrieval, topic check, location, crop count and seasons
+
+    Keyword and phrase checks share one Aho-Corasick pass; all regexes are
+    precompiled. Results are cached since the same questions recur.
+    """
+    query = query or ""
+    query_lower = query.lower()
+    matched = _automaton.find_all(query_lower)
+
+    # Places known to the corpus win over the preposition heuristics
+    places = tuple(_location_resolver.resolve(query_lower)) if _location_resolver and query else ()
+    if places:
+        location = places[0].name
+    else:
+        location = _find_location(query_lower) if query else None
+
+    return QueryAnalysis(
+        query=query,
+        query_lower=query_lower,
+        # Deduplicated: repeated words add nothing to BM25 here
+        words=tuple(dict.fromkeys(WORD_PATTERN.findall(query_lower))),
+        is_agriculture=not matched.isdisjoint(_agriculture_patterns),
+        location=location,
+        places=places,
+        crop_count=_find_crop_count(query_lower, matched) if query else DEFAULT_CROP_COUNT,
+        seasons=tuple(season for season in SEASON_KEYWORDS if season in matched)
+    )
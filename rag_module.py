@@ -1,18 +1,54 @@
+import heapq
 import json
+import math
 import os
 import logging
-import re
-from collections import defaultdict, Counter
+import threading
+import time
+from collections import defaultdict
+from fuzzy_module import build_trigram_index, fuzzy_lookup
+from query_module import analyze_query, set_location_resolver
+from location_module import LocationResolver, build_gazetteer
+from table_module import CropTable, answer_from_table, build_crop_table
+from token_module import count_tokens
+from cache_module import RetrievalCache, normalize_query
+from metrics_module import cache_hits_total
+from binary_index_module import BINARY_INDEX_FILE, MANIFEST_FILE, BinaryIndex
+from vector_module import EMBEDDINGS_META_FILE, VectorIndex, load_embedding_meta
 
 logger = logging.getLogger(__name__)
 
 SIMPLE_DB_DIR = "simple_db"
+DATABASE_FILES = ("database.json", "keywords.json")
+TRIGRAMS_FILE = "trigrams.json"
+LOCATIONS_FILE = "locations.json"
+CROP_TABLE_FILE = "crop_table.json"
 
-def load_database():
+# Retrieval ranks this many chunks, then packs as many as fit into the token budget
+MAX_CONTEXT_CHUNKS = 12
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+# Chunks scoring below this fraction of the best chunk only add noise to the prompt
+MIN_RELATIVE_SCORE = 0.5
+
+# Simple lookups ("what grows in Guntur") are answered from the crop table without the LLM
+DIRECT_ANSWERS = os.getenv("DIRECT_ANSWERS", "1") == "1"
+
+# Assembled contexts of recent queries; emptied when the index is reloaded
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+
+# With an embedding index, keyword and vector rankings are merged by reciprocal rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+RRF_K = 60
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def load_database(db_dir=SIMPLE_DB_DIR):
     """Load the simple keyword-based database"""
     try:
-        database_path = os.path.join(SIMPLE_DB_DIR, "database.json")
-        keywords_path = os.path.join(SIMPLE_DB_DIR, "keywords.json")
+        database_path = os.path.join(db_dir, "database.json")
+        keywords_path = os.path.join(db_dir, "keywords.json")
         
         if not os.path.exists(database_path) or not os.path.exists(keywords_path):
             raise FileNotFoundError("Database files not found. Please run prepare_data.py first.")
@@ -29,69 +65,484 @@ def load_database():
         logger.error(f"Error loading database: {str(e)}")
         return None, None
 
-def get_context_from_query(query, k=2):  # Reduced from 3 to 2 documents
-    """Retrieve relevant context using simple keyword matching with size limits"""
+def load_binary_index(db_dir=SIMPLE_DB_DIR):
+    """Memory-map the compact binary index, returning (database, keywords_index, index)"""
+    try:
+        index = BinaryIndex(os.path.join(db_dir, BINARY_INDEX_FILE))
+        return index.database, index.keywords_index, index
+        
+    except Exception as e:
+        logger.error(f"Error loading binary index: {str(e)}")
+        return None, None, None
+
+def get_index_files(db_dir=SIMPLE_DB_DIR):
+    """Return the index files the retriever serves from - the binary index when present"""
+    if os.path.exists(os.path.join(db_dir, BINARY_INDEX_FILE)):
+        return (BINARY_INDEX_FILE,)
+    return DATABASE_FILES
+
+def load_derived_index(filename, db_dir=SIMPLE_DB_DIR):
+    """Load an auxiliary index written by prepare_data.py, or None if it is missing or stale"""
+    try:
+        derived_path = os.path.join(db_dir, filename)
+        if not os.path.exists(derived_path):
+            return None
+        index_mtime = max(os.path.getmtime(os.path.join(db_dir, name)) for name in get_index_files(db_dir))
+        if os.path.getmtime(derived_path) < index_mtime:
+            return None
+        
+        with open(derived_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+        
+    except Exception as e:
+        logger.error(f"Error loading {filename}: {str(e)}")
+        return None
+
+def load_trigram_index(db_dir=SIMPLE_DB_DIR):
+    """Load the trigram index written by prepare_data.py, or None if it is missing or stale"""
+    return load_derived_index(TRIGRAMS_FILE, db_dir)
+
+def load_gazetteer(db_dir=SIMPLE_DB_DIR):
+    """Load the location gazetteer written by prepare_data.py, or None if it is missing or stale"""
+    return load_derived_index(LOCATIONS_FILE, db_dir)
+
+def load_crop_table(db_dir=SIMPLE_DB_DIR):
+    """Load the structured crop table written by prepare_data.py, or None if it is missing or stale"""
+    return load_derived_index(CROP_TABLE_FILE, db_dir)
+
+def load_vector_index(db_dir=SIMPLE_DB_DIR, num_docs=None):
+    """Memory-map the embedding index written by prepare_data.py --embeddings, or None if absent or stale"""
+    try:
+        meta = load_embedding_meta(db_dir)
+        if meta is None:
+            return None
+        if num_docs is not None and meta.get('num_docs') != num_docs:
+            logger.warning("Embedding index doesn't match the keyword index, using keyword search only")
+            return None
+        return VectorIndex(db_dir, meta)
+        
+    except Exception as e:
+        logger.error(f"Error loading embedding index: {str(e)}")
+        return None
+
+def get_database_signature(db_dir=SIMPLE_DB_DIR):
+    """Identify the published build, or return None if there is none
+
+    This is the manifest's (mtime, size, inode): the index files are renamed into
+    place one by one, so only the manifest marks a complete build. Databases built
+    before manifests existed fall back to (mtime, size) of every index file.
+    """
+    try:
+        stat = os.stat(os.path.join(db_dir, MANIFEST_FILE))
+        return ((MANIFEST_FILE, stat.st_mtime_ns, stat.st_size, stat.st_ino),)
+    except OSError:
+        pass
+    
+    signature = []
+    for name in get_index_files(db_dir):
+        try:
+            stat = os.stat(os.path.join(db_dir, name))
+        except OSError:
+            return None
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    # The embedding index is optional, and written after the keyword index
+    try:
+        stat = os.stat(os.path.join(db_dir, EMBEDDINGS_META_FILE))
+        signature.append((EMBEDDINGS_META_FILE, stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        pass
+    return tuple(signature)
+
+def top_k_documents(doc_scores, k):
+    """Select the k best (doc_id, score) pairs with a heap, breaking ties by doc id"""
+    return heapq.nlargest(k, doc_scores.items(), key=lambda item: (item[1], -item[0]))
+
+def reciprocal_rank_fusion(rankings, k):
+    """Merge ranked [(doc_id, score)] lists by summing 1 / (RRF_K + rank), returning the top k"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, (doc_id, score) in enumerate(ranking, 1):
+            fused[doc_id] += 1.0 / (RRF_K + rank)
+    return top_k_documents(fused, k)
+
+def apply_boosts(doc_scores, boosts):
+    """Add per-document bonuses; boosted documents become candidates even without a keyword match"""
+    if boosts:
+        for doc_id, boost in boosts.items():
+            doc_scores[doc_id] += boost
+    return doc_scores
+
+class IndexSnapshot:
+    """An immutable, fully loaded view of the keyword database"""
+
+    def __init__(self, database, keywords_index, generation, signature, trigram_index=None, binary_index=None,
+                 gazetteer=None, crop_table=None, vector_index=None):
+        self.database = database
+        self.keywords_index = keywords_index
+        self.generation = generation
+        self.signature = signature
+        self.binary_index = binary_index
+        self.vector_index = vector_index
+        self.trigram_index = trigram_index if trigram_index is not None else build_trigram_index(keywords_index)
+        self.location_resolver = LocationResolver(gazetteer if gazetteer is not None else build_gazetteer(database))
+        self.crop_table = CropTable(crop_table if crop_table is not None else build_crop_table(database))
+
+        # Postings statistics for BM25. Databases built before term frequencies
+        # were stored fall back to tf=1 and the average document length.
+        self.num_docs = len(database)
+        if binary_index is not None:
+            self.doc_lengths = binary_index.doc_lengths
+        else:
+            self.doc_lengths = [doc.get('length', 0) for doc in database]
+        known_lengths = [length for length in self.doc_lengths if length]
+        self.avg_doc_length = (sum(known_lengths) / len(known_lengths)) if known_lengths else 1.0
+        self._idf = {}
+        self._max_scores = {}
+
+    def idf(self, term, doc_freq):
+        idf = self._idf.get(term)
+        if idf is None:
+            idf = math.log(1 + (self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            self._idf[term] = idf
+        return idf
+
+    def term_frequencies(self, term, postings):
+        """Return term frequencies aligned with the term's postings"""
+        if self.binary_index is not None:
+            return self.binary_index.term_frequencies(term)
+        return [self.database[doc_id].get('term_freqs', {}).get(term, 1) if doc_id < self.num_docs else 0
+                for doc_id in postings]
+
+    def term_scores(self, term, candidates=None):
+        """Return [(doc_id, BM25 contribution)] for every document containing term, or only candidates"""
+        postings = self.keywords_index.get(term)
+        if not postings:
+            return []
+        idf = self.idf(term, len(postings))
+        scores = []
+        for doc_id, tf in zip(postings, self.term_frequencies(term, postings)):
+            if doc_id >= self.num_docs or (candidates is not None and doc_id not in candidates):
+                continue
+            doc_length = self.doc_lengths[doc_id] or self.avg_doc_length
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / self.avg_doc_length)
+            scores.append((doc_id, idf * tf * (BM25_K1 + 1) / (tf + norm)))
+        return scores
+
+    def max_score(self, term):
+        """Return the largest BM25 contribution term makes to any document"""
+        bound = self._max_scores.get(term)
+        if bound is None:
+            bound = max((score for _, score in self.term_scores(term)), default=0.0)
+            self._max_scores[term] = bound
+        return bound
+
+    def score_bm25(self, terms, k, weights=None, boosts=None):
+        """Return {doc_id: BM25 score plus boost} with exact scores for at least the top k documents
+
+        Terms are scored in decreasing order of their maximum contribution (MaxScore).
+        Once k documents score more than the remaining terms could give a document
+        that hasn't matched yet, those terms only update documents already scored.
+        """
+        bounds = []
+        for term in terms:
+            weight = weights.get(term, 1.0) if weights else 1.0
+            bounds.append((weight * self.max_score(term), weight, term))
+        bounds.sort(reverse=True)
+
+        # Boosted documents are candidates from the start, so unseen ones have no bonus
+        doc_scores = apply_boosts(defaultdict(float), boosts)
+        for i, (_, weight, term) in enumerate(bounds):
+            candidates = None
+            if len(doc_scores) >= k > 0:
+                remaining = sum(bound for bound, _, _ in bounds[i:])
+                if heapq.nlargest(k, doc_scores.values())[-1] > remaining:
+                    candidates = doc_scores
+            for doc_id, score in self.term_scores(term, candidates):
+                doc_scores[doc_id] += weight * score
+        return doc_scores
+
+    def search(self, terms, k, weights=None, boosts=None):
+        """Return the top-k (doc_id, score) pairs, best first
+
+        boosts adds a bonus per document, e.g. for the regions named in the query.
+        """
+        return top_k_documents(self.score_bm25(terms, k, weights, boosts), k)
+
+    def search_many(self, weights_list, k, boosts_list=None):
+        """Rank several queries in one pass, scoring each distinct term's postings only once"""
+        queries_by_term = defaultdict(list)
+        for i, weights in enumerate(weights_list):
+            for term, weight in weights.items():
+                queries_by_term[term].append((i, weight))
+        
+        all_scores = [defaultdict(float) for _ in weights_list]
+        for term, queries in queries_by_term.items():
+            term_scores = self.term_scores(term)
+            for i, weight in queries:
+                doc_scores = all_scores[i]
+                for doc_id, score in term_scores:
+                    doc_scores[doc_id] += weight * score
+        
+        boosts_list = boosts_list or [None] * len(all_scores)
+        return [top_k_documents(apply_boosts(doc_scores, boosts), k)
+                for doc_scores, boosts in zip(all_scores, boosts_list)]
+
+    def fuse_dense(self, queries, rankings, k):
+        """Fuse keyword rankings with nearest neighbours from the embedding index, if there is one"""
+        if self.vector_index is None or not HYBRID_SEARCH or not queries:
+            return rankings
+        vectors = self.vector_index.embed_queries(queries)
+        if vectors is None:
+            return rankings
+        return [reciprocal_rank_fusion([ranking, self.vector_index.search(vector, k)], k)
+                for ranking, vector in zip(rankings, vectors)]
+
+    def region_boosts(self, analysis):
+        """Document boosts for the places the query mentions"""
+        if not analysis.places:
+            return None
+        return self.location_resolver.document_boosts(analysis.places)
+
+    def expand_terms(self, words):
+        """Map query words to index terms with weights; unknown words are matched fuzzily at half weight"""
+        weights = {}
+        for word in words:
+            if word in self.keywords_index:
+                weights[word] = 1.0
+                continue
+            for keyword, distance in fuzzy_lookup(word, self.trigram_index):
+                weights.setdefault(keyword, 0.5)
+        return weights
+
+class KeywordRetriever:
+    """Keeps the keyword database resident and swaps in a fresh snapshot when it changes on disk"""
+
+    def __init__(self, db_dir=SIMPLE_DB_DIR, check_interval=1.0):
+        self.db_dir = db_dir
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._generation = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Return the current snapshot, reloading it if prepare_data.py rewrote the files"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._last_check < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            self._last_check = time.monotonic()
+
+            signature = get_database_signature(self.db_dir)
+            if signature is None or (snapshot is not None and signature == snapshot.signature):
+                return snapshot
+            if snapshot is not None and snapshot.signature[0][0] == MANIFEST_FILE \
+                    and signature[0][0] != MANIFEST_FILE:
+                # A rebuild removed the manifest and hasn't published the new one yet
+                return snapshot
+
+            if get_index_files(self.db_dir)[0] == BINARY_INDEX_FILE:
+                database, keywords_index, binary_index = load_binary_index(self.db_dir)
+            else:
+                database, keywords_index = load_database(self.db_dir)
+                binary_index = None
+            if database is None:
+                return snapshot
+            
+            trigram_index = load_trigram_index(self.db_dir)
+            gazetteer = load_gazetteer(self.db_dir)
+            crop_table = load_crop_table(self.db_dir)
+            vector_index = load_vector_index(self.db_dir, len(database))
+            # A rebuild started while we were reading - keep serving the old snapshot
+            if get_database_signature(self.db_dir) != signature:
+                return snapshot
+
+            self._generation += 1
+            self._snapshot = IndexSnapshot(
+                database, keywords_index, self._generation, signature,
+                trigram_index=trigram_index,
+                binary_index=binary_index,
+                gazetteer=gazetteer,
+                crop_table=crop_table,
+                vector_index=vector_index
+            )
+            set_location_resolver(self._snapshot.location_resolver)
+            logger.info(f"Loaded keyword database generation {self._generation} ({len(database)} documents)")
+            return self._snapshot
+
+_retriever = KeywordRetriever()
+retrieval_cache = RetrievalCache(RETRIEVAL_CACHE_SIZE) if RETRIEVAL_CACHE_SIZE > 0 else None
+
+def get_retriever():
+    """Return the process-wide retriever"""
+    return _retriever
+
+def drop_weak_matches(ranked, min_relative_score=MIN_RELATIVE_SCORE):
+    """Drop documents scoring far below the best one from a BM25 ranking
+
+    Done before fusion with the embedding ranking: in RRF scores, documents found
+    by only one retriever always fall below half the top score.
+    """
+    if not ranked:
+        return ranked
+    min_score = ranked[0][1] * min_relative_score
+    return [(doc_id, score) for doc_id, score in ranked if score >= min_score]
+
+def assemble_context(database, ranked, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Greedily pack the best-ranked chunks into token_budget, regrouped under their section titles
+
+    Chunks that don't fit are skipped so smaller, lower-ranked ones can still use
+    the remaining budget. Returns (context, number of chunks used).
+    """
+    sections = {}  # parent -> (title, [(chunk_id, text)]), in the order sections were first picked
+    used_tokens = 0
+    
+    for doc_id, score in ranked:
+        if doc_id >= len(database):
+            continue
+        doc = database[doc_id]
+        text = doc['full_text']
+        cost = doc.get('tokens') or count_tokens(text)
+        
+        # Documents built before chunking hold a whole section, title included
+        if 'parent' in doc:
+            parent, title = doc['parent'], doc.get('title', '')
+        else:
+            parent, title = ('doc', doc_id), ''
+        if parent not in sections and title:
+            cost += count_tokens(title)
+        
+        if used_tokens + cost > token_budget:
+            continue
+        used_tokens += cost
+        sections.setdefault(parent, (title, []))[1].append((doc_id, text))
+    
+    if not sections and ranked and ranked[0][0] < len(database):
+        # Nothing fits whole: fall back to the start of the best match (~4 chars per token)
+        text = database[ranked[0][0]]['full_text']
+        return text[:token_budget * 4 - 3] + "...", 1
+    
+    context_parts = []
+    for title, chunks in sections.values():
+        body = '\n'.join(text for chunk_id, text in sorted(chunks))
+        context_parts.append(f"{title}\n{body}" if title else body)
+    
+    return "\n\n".join(context_parts), sum(len(chunks) for title, chunks in sections.values())
+
+def retrieval_cache_key(snapshot, query, analysis, k, token_budget):
+    """Everything retrieval depends on: the query's term set, the places it names, k and the budget"""
+    if snapshot.vector_index is not None and HYBRID_SEARCH:
+        # Embeddings see word order, so the whole normalized query matters
+        terms = (normalize_query(query),)
+    else:
+        terms = tuple(sorted(analysis.words))
+    return terms, tuple(place.name for place in analysis.places), k, token_budget
+
+def get_context_from_query(query, k=MAX_CONTEXT_CHUNKS, analysis=None, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Retrieve relevant context: the best k chunks, packed into the context token budget"""
     try:
         if not query or not query.strip():
             return ""
         
-        database, keywords_index = load_database()
-        if not database or not keywords_index:
+        snapshot = _retriever.snapshot()
+        if not snapshot or not snapshot.database or not snapshot.keywords_index:
             return ""
         
-        # Extract keywords from query
-        query_words = re.findall(r'\b[a-zA-Z]{3,}\b', query.lower())
+        if analysis is None:
+            analysis = analyze_query(query)
         
-        if not query_words:
+        if not analysis.words:
             return ""
         
-        # Score documents based on keyword matches
-        doc_scores = Counter()
+        # Repeat questions skip scoring and context assembly entirely
+        cache_key = retrieval_cache_key(snapshot, query, analysis, k, token_budget)
+        if retrieval_cache is not None:
+            context = retrieval_cache.get(snapshot.generation, cache_key)
+            if context is not None:
+                logger.info(f"Retrieval cache hit for query: {query}")
+                cache_hits_total.inc(cache="retrieval")
+                return context
         
-        for word in query_words:
-            if word in keywords_index:
-                for doc_id in keywords_index[word]:
-                    doc_scores[doc_id] += 1
+        # Rank documents with BM25; misspelled or inflected words ("nashk",
+        # "groundnuts") are resolved through the trigram index, and documents
+        # about the places named in the query are boosted
+        weights = snapshot.expand_terms(analysis.words)
+        top_docs = drop_weak_matches(snapshot.search(weights, k, weights, snapshot.region_boosts(analysis)))
+        # Embeddings catch paraphrases keywords miss ("little water" vs "rainfed")
+        top_docs = snapshot.fuse_dense([query], [top_docs], k)[0]
         
-        # Get top k documents
-        top_docs = doc_scores.most_common(k)
+        context, num_chunks = assemble_context(snapshot.database, top_docs, token_budget)
+        if retrieval_cache is not None:
+            retrieval_cache.set(snapshot.generation, cache_key, context)
         
-        if not top_docs:
-            # Fallback: partial matching
-            for word in query_words:
-                for keyword in keywords_index:
-                    if word in keyword or keyword in word:
-                        for doc_id in keywords_index[keyword]:
-                            doc_scores[doc_id] += 0.5
-            
-            top_docs = doc_scores.most_common(k)
-        
-        # Get document content with size limits
-        context_parts = []
-        total_length = 0
-        max_context_length = 2000  # Limit total context size
-        
-        for doc_id, score in top_docs:
-            if doc_id < len(database):
-                doc_content = database[doc_id]['full_text']
-                
-                # Check if adding this document would exceed limit
-                if total_length + len(doc_content) > max_context_length:
-                    # Truncate the document to fit
-                    remaining_space = max_context_length - total_length
-                    if remaining_space > 100:  # Only add if we have meaningful space
-                        truncated_content = doc_content[:remaining_space-3] + "..."
-                        context_parts.append(truncated_content)
-                    break
-                
-                context_parts.append(doc_content)
-                total_length += len(doc_content)
-        
-        context = "\n\n".join(context_parts)
-        
-        logger.info(f"Retrieved {len(context_parts)} documents ({len(context)} chars) for query: {query}")
+        logger.info(f"Retrieved {num_chunks} chunks ({len(context)} chars) for query: {query}")
         return context
         
     except Exception as e:
         logger.error(f"Error retrieving context: {str(e)}")
-        return ""
\ No newline at end of file
+        return ""
+
+def get_direct_answer(query, analysis=None):
+    """Answer simple lookups straight from the crop table, or return None to go through the LLM"""
+    try:
+        if not DIRECT_ANSWERS or not query or not query.strip():
+            return None
+        
+        snapshot = _retriever.snapshot()
+        if not snapshot:
+            return None
+        
+        if analysis is None:
+            analysis = analyze_query(query)
+        
+        answer = answer_from_table(snapshot.crop_table, analysis)
+        if answer:
+            logger.info(f"Answered from the crop table: {query}")
+        return answer
+        
+    except Exception as e:
+        logger.error(f"Error answering from the crop table: {str(e)}")
+        return None
+
+def get_contexts_for_queries(queries, k=MAX_CONTEXT_CHUNKS, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Retrieve context for many queries against one snapshot in a single scoring pass"""
+    try:
+        snapshot = _retriever.snapshot()
+        if not snapshot or not snapshot.database or not snapshot.keywords_index:
+            return [""] * len(queries)
+        
+        contexts = [""] * len(queries)
+        analyses = {}
+        cache_keys = {}
+        for i, query in enumerate(queries):
+            if not query or not query.strip():
+                continue
+            analysis = analyze_query(query)
+            cache_key = retrieval_cache_key(snapshot, query, analysis, k, token_budget)
+            context = retrieval_cache.get(snapshot.generation, cache_key) if retrieval_cache is not None else None
+            if context is not None:
+                contexts[i] = context
+                cache_hits_total.inc(cache="retrieval")
+            else:
+                analyses[i] = analysis
+                cache_keys[i] = cache_key
+        
+        # Only cache misses are scored
+        pending = list(analyses)
+        weights_list = [snapshot.expand_terms(analyses[i].words) for i in pending]
+        boosts_list = [snapshot.region_boosts(analyses[i]) for i in pending]
+        ranked = [drop_weak_matches(top_docs) for top_docs in snapshot.search_many(weights_list, k, boosts_list)]
+        ranked = snapshot.fuse_dense([queries[i] for i in pending], ranked, k)
+        for i, top_docs in zip(pending, ranked):
+            contexts[i] = assemble_context(snapshot.database, top_docs, token_budget)[0]
+            if retrieval_cache is not None:
+                retrieval_cache.set(snapshot.generation, cache_keys[i], contexts[i])
+        
+        logger.info(f"Retrieved context for a batch of {len(queries)} queries ({len(pending)} scored)")
+        return contexts
+        
+    except Exception as e:
+        logger.error(f"Error retrieving batch context: {str(e)}")
+        return [""] * len(queries)
\ No newline at end of file
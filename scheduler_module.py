@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from metrics_module import llm_queue_depth, llm_queue_wait_seconds, llm_shed_total
+
+logger = logging.getLogger(__name__)
+
+# Lower values are admitted first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+def parse_priority(name, default=INTERACTIVE):
+    """Map a request's "priority" field ("interactive" or "batch") to a priority"""
+    for priority, priority_name in PRIORITY_NAMES.items():
+        if name == priority_name:
+            return priority
+    return default
+
+class SchedulerBusyError(Exception):
+    """Raised when an LLM call is shed: the queue is full or the call waited past its deadline"""
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to capacity (one minute's worth by default)"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (amounts above capacity wait for a full bucket)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount, now):
+        # May go negative for amounts above capacity; later calls then wait it out
+        self._refill(now)
+        self.tokens -= amount
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def give_back(self, amount, now):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class _Ticket:
+    __slots__ = ('priority', 'tokens', 'enqueued', 'deadline', 'notify', 'admitted', 'reason', 'done')
+
+    def __init__(self, priority, tokens, enqueued, deadline, notify):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.deadline = deadline
+        self.notify = notify
+        self.admitted = False
+        self.reason = None
+        self.done = False
+
+class LLMScheduler:
+    """Admission control for upstream LLM calls
+
+    Calls are admitted while the requests-per-minute and tokens-per-minute buckets
+    allow; the rest wait in a bounded queue, interactive calls ahead of batch ones,
+    each for at most its priority's max_wait. When the queue is full the newest
+    lowest-priority call is shed (a batch call makes room for an interactive one),
+    so callers get a fast "busy" reply instead of a 429 from the provider. A rate
+    of 0 disables that limit.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_queue=100, max_wait=None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait or {INTERACTIVE: 15.0, BATCH: 120.0}
+        self.admitted = 0
+        self.shed = 0
+        self._queue = []  # (priority, sequence, ticket) heap
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+    def _wait_time(self, tokens, now):
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = self.request_bucket.wait_time(1, now)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.wait_time(tokens, now))
+        return wait
+
+    def _take(self, tokens, now):
+        if self.request_bucket is not None:
+            self.request_bucket.take(1, now)
+        if self.token_bucket is not None:
+            self.token_bucket.take(tokens, now)
+
+    def _update_depth(self):
+        depths = dict.fromkeys(PRIORITY_NAMES, 0)
+        for priority, _, _ in self._queue:
+            depths[priority] = depths.get(priority, 0) + 1
+        for priority, depth in depths.items():
+            llm_queue_depth.set(depth, priority=PRIORITY_NAMES.get(priority, priority))
+
+    def _resolve(self, ticket, admitted, reason, now):
+        """Admit or shed a queued or arriving ticket; called with the lock held"""
+        ticket.admitted = admitted
+        ticket.reason = reason
+        ticket.done = True
+        name = PRIORITY_NAMES.get(ticket.priority, ticket.priority)
+        if admitted:
+            self.admitted += 1
+            llm_queue_wait_seconds.observe(now - ticket.enqueued, priority=name)
+        else:
+            self.shed += 1
+            llm_shed_total.inc(priority=name, reason=reason)
+            logger.warning(f"Shedding {name} LLM call: {reason}")
+        if ticket.notify is not None:
+            ticket.notify()
+
+    def _enqueue(self, tokens, priority, notify):
+        """Admit right away, queue, or shed; returns the ticket (done unless queued)"""
+        now = time.monotonic()
+        ticket = _Ticket(priority, tokens, now, now + self.max_wait.get(priority, 60.0), None)
+        with self._cond:
+            if not self._queue and self._wait_time(tokens, now) <= 0:
+                self._take(tokens, now)
+                self._resolve(ticket, True, None, now)
+                return ticket
+
+            if len(self._queue) >= self.max_queue:
+                # The newest call of the lowest priority goes first
+                worst = max(self._queue, key=lambda entry: (entry[0], entry[1]))
+                if worst[0] <= priority:
+                    self._resolve(ticket, False, "queue_full", now)
+                    return ticket
+                self._queue.remove(worst)
+                heapq.heapify(self._queue)
+                self._resolve(worst[2], False, "queue_full", now)
+
+            ticket.notify = notify
+            heapq.heappush(self._queue, (priority, next(self._sequence), ticket))
+            self._update_depth()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="llm-scheduler", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return ticket
+
+    def _cancel(self, ticket):
+        with self._cond:
+            if not ticket.done:
+                ticket.done = True
+                self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+                heapq.heapify(self._queue)
+                self._update_depth()
+
+    def _dispatch(self):
+        """Admit queued calls in priority order as the buckets refill, and shed expired ones"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                expired = [entry for entry in self._queue if entry[2].deadline <= now]
+                if expired:
+                    self._queue = [entry for entry in self._queue if entry[2].deadline > now]
+                    heapq.heapify(self._queue)
+                    self._update_depth()
+                    for _, _, ticket in expired:
+                        self._resolve(ticket, False, "deadline", now)
+
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+
+                ticket = self._queue[0][2]
+                wait = self._wait_time(ticket.tokens, now)
+                if wait <= 0:
+                    heapq.heappop(self._queue)
+                    self._update_depth()
+                    self._take(ticket.tokens, now)
+                    self._resolve(ticket, True, None, now)
+                    continue
+
+                next_deadline = min(entry[2].deadline for entry in self._queue)
+                self._cond.wait(min(wait, next_deadline - now))
+
+    def admit(self, tokens, priority=INTERACTIVE):
+        """Block until the call may go upstream; raises SchedulerBusyError if it is shed"""
+        event = threading.Event()
+        ticket = self._enqueue(tokens, priority, event.set)
+        if not ticket.done:
+            # The dispatcher resolves every ticket by its deadline; the margin is a safety net
+            if not event.wait(self.max_wait.get(priority, 60.0) + 1.0):
+                self._cancel(ticket)
+        if not ticket.admitted:
+            raise SchedulerBusyError(ticket.reason or "deadline")
+        return tokens
+
+    async def admit_async(self, tokens, priority=INTERACTIVE):
+        """admit() for coroutines: waits on the event loop instead of a thread"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        ticket = self._enqueue(tokens, priority, notify)
+        if not ticket.done:
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The client went away; don't spend quota on it
+                self._cancel(ticket)
+                raise
+        if not ticket.admitted:
+            raise SchedulerBusyError(ticket.reason or "deadline")
+        return tokens
+
+    def settle(self, reserved, used):
+        """Return unused reserved tokens once the call's actual usage is known
+
+        A failed call settles with used=0 to give everything back; used=None
+        (usage unknown) keeps the whole reservation.
+        """
+        if self.token_bucket is None or used is None or used >= reserved:
+            return
+        with self._cond:
+            self.token_bucket.give_back(reserved - used, time.monotonic())
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "requests_available": round(self.request_bucket.available(now), 1) if self.request_bucket else None,
+                "tokens_available": round(self.token_bucket.available(now)) if self.token_bucket else None,
+                "oldest_wait_seconds": round(max((now - entry[2].enqueued for entry in self._queue), default=0.0), 3)
+            }
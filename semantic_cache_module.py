@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed when the semantic cache is enabled
+    np = None
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+class SemanticCache:
+    """Reuses answers for paraphrased questions using local sentence embeddings
+
+    Embeddings of recently answered queries are kept in a fixed-size ring buffer,
+    so a lookup is a single matrix-vector product on CPU. Entries only match
+    queries with the same scope (location and crop count), so advice for one
+    place is never served for another.
+    """
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, threshold=0.9, max_size=256, ttl=3600):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._available = np is not None
+        self._lock = threading.Lock()
+        # Held while the model loads, so concurrent first requests load it only once
+        self._model_lock = threading.Lock()
+        self._vectors = None
+        self._scopes = [None] * max_size
+        self._values = [None] * max_size
+        self._expires = None
+        self._next = 0
+
+    def _load_model(self):
+        if self._model is None and self._available:
+            with self._model_lock:
+                if self._model is None and self._available:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        self._model = SentenceTransformer(self.model_name, device="cpu")
+                    except Exception as e:
+                        logger.error(f"Semantic cache disabled, could not load embedding model: {str(e)}")
+                        self._available = False
+        return self._model
+
+    def embed(self, query):
+        """Return the unit-length embedding of query, or None if embeddings are unavailable"""
+        model = self._load_model()
+        if model is None:
+            return None
+        vector = model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0]
+        return vector.astype(np.float32)
+
+    def get(self, vector, scope):
+        """Return the cached answer most similar to vector within scope, or None"""
+        if vector is None:
+            return None
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors @ vector
+            valid = self._expires > time.time()
+            valid &= np.fromiter((s == scope for s in self._scopes), dtype=bool, count=self.max_size)
+            similarities[~valid] = -1.0
+
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                self.hits += 1
+                return self._values[best]
+
+            self.misses += 1
+            return None
+
+    def set(self, vector, scope, value):
+        if vector is None:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._expires = np.zeros(self.max_size, dtype=np.float64)
+
+            slot = self._next
+            self._vectors[slot] = vector
+            self._expires[slot] = time.time() + self.ttl
+            self._scopes[slot] = scope
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "threshold": self.threshold,
+                "available": self._available,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
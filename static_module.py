@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; browsers fall back to gzip
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+# Pages must be revalidated, which costs a 304 (no body) once the page is cached
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the bytes (and so the ETag) stable across restarts
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def parse_accept_encoding(header):
+    """Return {coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (header or "").split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in candidates)
+
+class AssetVersion:
+    """One version of a file: its bytes, precompressed variants and their ETags"""
+
+    def __init__(self, data, signature):
+        self.signature = signature
+        digest = hashlib.sha1(data).hexdigest()[:20]
+        # Each encoding is a different representation, so each gets its own strong ETag
+        self.variants = {None: (data, f'"{digest}"')}
+        for encoding in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            compressed = compress(data, encoding)
+            if len(compressed) < len(data):
+                self.variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+
+    def select(self, accept_encoding):
+        """Return (encoding or None, body, etag) for the best encoding the client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ENCODINGS:
+            q = accepted.get(encoding, accepted.get('*', 0.0))
+            if q > 0 and encoding in self.variants:
+                return (encoding,) + self.variants[encoding]
+        return (None,) + self.variants[None]
+
+class StaticAsset:
+    """A file served from memory, precompressed once and reloaded when it changes on disk"""
+
+    def __init__(self, path, content_type, cache_control=DEFAULT_CACHE_CONTROL, check_interval=1.0):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.check_interval = check_interval
+        self._version = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the current AssetVersion, or None if the file doesn't exist"""
+        version = self._version
+        if version is not None and time.monotonic() - self._last_check < self.check_interval:
+            return version
+
+        with self._lock:
+            version = self._version
+            self._last_check = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self._version = None
+                return None
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if version is not None and version.signature == signature:
+                return version
+
+            try:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+                self._version = AssetVersion(data, signature)
+                encodings = [encoding for encoding in self._version.variants if encoding]
+                logger.info(f"Loaded {self.path} ({len(data)} bytes, precompressed: {', '.join(encodings) or 'none'})")
+            except Exception as e:
+                logger.error(f"Error loading {self.path}: {str(e)}")
+            return self._version
+
+    def respond(self, accept_encoding=None, if_none_match=None):
+        """Return (status, body, headers) for a GET, or None if the file doesn't exist"""
+        version = self.current()
+        if version is None:
+            return None
+
+        encoding, body, etag = version.select(accept_encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if etag_matches(if_none_match, etag):
+            return 304, b"", headers
+
+        headers["Content-Type"] = self.content_type
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return 200, body, headers
@@ -0,0 +1,203 @@
+import re
+from array import array
+from collections import Counter
+
+from location_module import CITY_IN_STATE, STATE_MENTION, INDIAN_STATES, place_key
+
+SOIL_TYPES = ['alluvial', 'black', 'red', 'laterite', 'sandy', 'clayey', 'clay', 'loamy', 'loam',
+              'desert', 'saline', 'peaty', 'mountain']
+IRRIGATION_TYPES = ['canal', 'tube well', 'well', 'drip', 'sprinkler', 'tank', 'rainfed']
+
+SOIL_PATTERN = re.compile(rf"\b({'|'.join(SOIL_TYPES)})\b(?=[\w\s]*\bsoil)", re.IGNORECASE)
+RAINFALL_PATTERN = re.compile(r'rainfall[^\d\n]{0,20}(\d+(?:\.\d+)?)\s*mm', re.IGNORECASE)
+TEMPERATURE_PATTERN = re.compile(r'temp(?:erature)?[^\d\n]{0,20}(\d+(?:\.\d+)?)\s*(?:°\s*c|degrees|c\b)', re.IGNORECASE)
+IRRIGATION_PATTERN = re.compile(rf"\b({'|'.join(IRRIGATION_TYPES)})\b", re.IGNORECASE)
+CROPS_PATTERN = re.compile(r'recommended crops?\s*[:\-]?\s*([^.\n]+)', re.IGNORECASE)
+CROP_SEPARATOR = re.compile(r'\s*(?:,|\band\b|/|;)\s*', re.IGNORECASE)
+
+# Query-side filters
+QUERY_RAINFALL = re.compile(r'(\d+(?:\.\d+)?)\s*mm\b')
+QUERY_TEMPERATURE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:°\s*c\b|degrees?\b|deg\b)')
+RAINFALL_TOLERANCE = 0.2  # +/- 20% of the asked rainfall
+TEMPERATURE_TOLERANCE = 3.0  # +/- degrees C
+
+# Questions that need explanation or advice beyond a lookup go to the LLM
+NEEDS_LLM_WORDS = frozenset([
+    'why', 'how', 'when', 'explain', 'compare', 'difference', 'tips', 'advice', 'care',
+    'fertilizer', 'pesticide', 'herbicide', 'pest', 'disease', 'price', 'profit', 'market',
+    'income', 'yield', 'sowing', 'harvest', 'organic', 'kharif', 'rabi', 'zaid', 'monsoon',
+    'summer', 'winter', 'season'
+])
+
+# A lookup has to ask which crops to grow; anything else ("weather in Guntur") goes to the LLM
+CROP_QUESTION_WORDS = frozenset([
+    'crop', 'crops', 'grow', 'grows', 'growing', 'plant', 'planting', 'cultivate', 'cultivation',
+    'recommend', 'recommended', 'recommendation', 'suitable', 'best'
+])
+
+COLUMNS = ['city', 'state', 'soil', 'rainfall_mm', 'temp_c', 'irrigation', 'crops', 'chunk']
+
+_canonical_states = {place_key(state): state for state in INDIAN_STATES}
+
+def parse_crop_row(text):
+    """Parse one line of crop data into a row dict, or None if it has no location or crops"""
+    crops_match = CROPS_PATTERN.search(text)
+    if not crops_match:
+        return None
+    crops = [crop.strip().title() for crop in CROP_SEPARATOR.split(crops_match.group(1)) if crop.strip()]
+
+    city_match = CITY_IN_STATE.search(text)
+    if city_match:
+        city, state = city_match.group(1), city_match.group(2)
+    else:
+        state_match = STATE_MENTION.search(text)
+        city, state = None, state_match.group(1) if state_match else None
+    if not crops or not (city or state):
+        return None
+
+    soil = SOIL_PATTERN.search(text)
+    rainfall = RAINFALL_PATTERN.search(text)
+    temperature = TEMPERATURE_PATTERN.search(text)
+    # Prefer the irrigation type named after "irrigation", e.g. "irrigation: canal",
+    # falling back to one named anywhere, e.g. "canal irrigation"
+    irrigation_at = text.lower().find('irrigation')
+    irrigation = IRRIGATION_PATTERN.search(text, irrigation_at) if irrigation_at >= 0 else None
+    if irrigation is None:
+        irrigation = IRRIGATION_PATTERN.search(text)
+
+    return {
+        'city': city,
+        'state': _canonical_states.get(place_key(state), state) if state else None,
+        'soil': soil.group(1).lower() if soil else None,
+        'rainfall_mm': float(rainfall.group(1)) if rainfall else None,
+        'temp_c': float(temperature.group(1)) if temperature else None,
+        'irrigation': irrigation.group(1).lower() if irrigation else None,
+        'crops': crops
+    }
+
+def build_crop_table(database):
+    """Parse every chunk into a columnar table (one list per column)"""
+    table = {column: [] for column in COLUMNS}
+    for doc_id, doc in enumerate(database):
+        # The section title may name the state ("Maharashtra Crop Data")
+        row = parse_crop_row(doc['full_text']) or parse_crop_row(doc.get('title', '') + ', ' + doc['full_text'])
+        if row is None:
+            continue
+        row['chunk'] = doc_id
+        for column in COLUMNS:
+            table[column].append(row[column])
+    return table
+
+class CropTable:
+    """Typed, columnar view of the crop rows; numeric columns are float arrays (NaN = unknown)"""
+
+    def __init__(self, table):
+        self.num_rows = len(table.get('crops', []))
+        self.city = [(city or '').lower() for city in table.get('city', [])]
+        self.state = [(state or '').lower() for state in table.get('state', [])]
+        self.soil = table.get('soil', [])
+        self.irrigation = table.get('irrigation', [])
+        self.crops = table.get('crops', [])
+        self.chunk = table.get('chunk', [])
+        self.display_city = table.get('city', [])
+        self.display_state = table.get('state', [])
+        nan = float('nan')
+        self.rainfall_mm = array('d', (nan if value is None else value for value in table.get('rainfall_mm', [])))
+        self.temp_c = array('d', (nan if value is None else value for value in table.get('temp_c', [])))
+
+    def select(self, places=(), soils=(), irrigations=(), rainfall=None, temperature=None):
+        """Return the row indexes matching every given filter, each applied as one column scan"""
+        rows = range(self.num_rows)
+        if places:
+            cities = {place.name.lower() for place in places if place.kind == 'city'}
+            states = {place.name.lower() for place in places if place.kind == 'state'}
+            rows = [i for i in rows if self.city[i] in cities or self.state[i] in states]
+        if soils:
+            rows = [i for i in rows if self.soil[i] in soils]
+        if irrigations:
+            rows = [i for i in rows if self.irrigation[i] in irrigations]
+        if rainfall is not None:
+            low, high = rainfall * (1 - RAINFALL_TOLERANCE), rainfall * (1 + RAINFALL_TOLERANCE)
+            column = self.rainfall_mm
+            rows = [i for i in rows if low <= column[i] <= high]
+        if temperature is not None:
+            low, high = temperature - TEMPERATURE_TOLERANCE, temperature + TEMPERATURE_TOLERANCE
+            column = self.temp_c
+            rows = [i for i in rows if low <= column[i] <= high]
+        return list(rows)
+
+def describe_row(table, i):
+    """One-line summary of a row's growing conditions"""
+    place = table.display_city[i] or table.display_state[i]
+    if table.display_city[i] and table.display_state[i]:
+        place = f"{table.display_city[i]} ({table.display_state[i]})"
+    details = []
+    if table.soil[i]:
+        details.append(f"{table.soil[i].title()} soil")
+    if table.rainfall_mm[i] == table.rainfall_mm[i]:  # not NaN
+        details.append(f"{table.rainfall_mm[i]:g} mm rainfall")
+    if table.temp_c[i] == table.temp_c[i]:
+        details.append(f"{table.temp_c[i]:g}°C")
+    if table.irrigation[i]:
+        details.append(f"{table.irrigation[i]} irrigation")
+    return f"{place}: {', '.join(details)}" if details else place
+
+def answer_from_table(table, analysis):
+    """Answer simple lookups ("what grows in Guntur", "crops for 500mm rainfall and loamy soil")
+
+    Returns the HTML answer, or None when the question needs the LLM or no row matches.
+    """
+    if table is None or not table.num_rows or not analysis.is_agriculture:
+        return None
+    words = set(analysis.words)
+    if words.isdisjoint(CROP_QUESTION_WORDS) or not words.isdisjoint(NEEDS_LLM_WORDS):
+        return None
+
+    soils = {soil for soil in SOIL_TYPES if soil in words}
+    # "well" is too common a word to read as an irrigation type unless irrigation is asked about
+    irrigations = set()
+    if 'irrigation' in analysis.query_lower or 'irrigated' in analysis.query_lower:
+        irrigations = {match.lower() for match in IRRIGATION_PATTERN.findall(analysis.query_lower)}
+    rainfall = QUERY_RAINFALL.search(analysis.query_lower)
+    temperature = QUERY_TEMPERATURE.search(analysis.query_lower)
+    filter_words = {'soil', 'irrigation', 'rainfall'} | set(SOIL_TYPES) | set(IRRIGATION_TYPES)
+    if analysis.location and not analysis.places and not set(analysis.location.lower().split()) <= filter_words:
+        return None  # A place the table doesn't know - let the LLM generalise
+    if not (analysis.places or soils or irrigations or rainfall or temperature):
+        return None
+
+    rows = table.select(
+        places=analysis.places,
+        soils=soils,
+        irrigations=irrigations,
+        rainfall=float(rainfall.group(1)) if rainfall else None,
+        temperature=float(temperature.group(1)) if temperature else None
+    )
+    if not rows:
+        return None
+
+    # Rank crops by how many matching locations recommend them
+    crop_counts = Counter(crop for i in rows for crop in table.crops[i])
+    top_crops = [crop for crop, count in crop_counts.most_common(analysis.crop_count)]
+
+    conditions = []
+    if analysis.places:
+        conditions.append(', '.join(place.name for place in analysis.places))
+    if soils:
+        conditions.append(' / '.join(sorted(soil.title() for soil in soils)) + " soil")
+    if rainfall:
+        conditions.append(f"about {rainfall.group(1)} mm rainfall")
+    if temperature:
+        conditions.append(f"about {temperature.group(1)}°C")
+    if irrigations:
+        conditions.append(' / '.join(sorted(irrigations)) + " irrigation")
+
+    lines = [f"🌾 <strong>Recommended crops for {' with '.join(conditions)}:</strong>", ""]
+    for number, crop in enumerate(top_crops, 1):
+        growers = [table.display_city[i] or table.display_state[i] for i in rows if crop in table.crops[i]]
+        lines.append(f"{number}. <strong>{crop}</strong> - recommended in {', '.join(growers[:3])}")
+    lines.append("")
+    lines.append("📍 <strong>Matching areas:</strong>")
+    for i in rows[:5]:
+        lines.append(f"• {describe_row(table, i)}")
+    return '\n'.join(lines)
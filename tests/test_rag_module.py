@@ -0,0 +1,18 @@
+from rag_module import assemble_context, drop_weak_matches, reciprocal_rank_fusion
+
+def make_database(n):
+    return [{'full_text': f"Chunk {i}", 'tokens': 3, 'parent': ('doc', i), 'title': ''} for i in range(n)]
+
+def test_fused_ranking_keeps_single_retriever_chunks():
+    keyword_ranking = drop_weak_matches([(0, 9.0), (1, 8.0), (2, 7.5), (3, 1.0)])
+    dense_ranking = [(0, 0.9), (4, 0.8), (5, 0.7), (6, 0.6)]
+    fused = reciprocal_rank_fusion([keyword_ranking, dense_ranking], 10)
+
+    context, num_chunks = assemble_context(make_database(10), fused, token_budget=400)
+
+    assert num_chunks == 6
+    assert "Chunk 4" in context and "Chunk 2" in context
+
+def test_drop_weak_matches_cuts_below_half_the_best_score():
+    assert drop_weak_matches([(0, 10.0), (1, 5.0), (2, 4.9)]) == [(0, 10.0), (1, 5.0)]
+    assert drop_weak_matches([]) == []
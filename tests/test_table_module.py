@@ -0,0 +1,10 @@
+from table_module import parse_crop_row
+
+def test_irrigation_named_after_the_word_irrigation():
+    row = parse_crop_row("Nagpur, Maharashtra: black soil, irrigation: drip. Recommended crops: Cotton, Soybean")
+    assert row['irrigation'] == 'drip'
+
+def test_irrigation_named_before_the_word_irrigation():
+    row = parse_crop_row("Nagpur, Maharashtra: black soil with canal irrigation. Recommended crops: Cotton, Soybean")
+    assert row['irrigation'] == 'canal'
+    assert row['crops'] == ['Cotton', 'Soybean']
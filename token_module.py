@@ -0,0 +1,29 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENCODING = "cl100k_base"
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            # tiktoken fetches its BPE file on first use, which fails offline
+            logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+    return _encoding
+
+def count_tokens(text):
+    """Number of tokens in text, or an estimate of ~4 characters per token without tiktoken"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, (len(text) + 3) // 4)
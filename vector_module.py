@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from semantic_cache_module import DEFAULT_EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the optional dense index
+    np = None
+
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDING_SCALES_FILE = "embedding_scales.npy"  # Per-row scales of an int8 matrix
+EMBEDDINGS_META_FILE = "embeddings.json"
+EMBEDDING_DTYPES = ("float32", "int8")
+EMBEDDING_BATCH_SIZE = 64
+# Rows scored per matrix product, so int8 rows are dequantized a block at a time
+SEARCH_BLOCK_ROWS = 65536
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Load a sentence-transformers model on CPU once per process, or return None if unavailable
+
+    model_name may be a local directory, which loads without network access.
+    """
+    with _models_lock:
+        if model_name not in _models:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _models[model_name] = SentenceTransformer(model_name, device="cpu")
+            except Exception as e:
+                logger.error(f"Could not load embedding model {model_name}: {str(e)}")
+                _models[model_name] = None
+        return _models[model_name]
+
+def embed_texts(model, texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """Unit-length float32 embeddings of texts, one row per text"""
+    vectors = model.encode(list(texts), batch_size=batch_size, normalize_embeddings=True,
+                           convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+def quantize_int8(matrix):
+    """Symmetric per-row int8 quantization: returns (int8 matrix, float32 scales)"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+def embedding_text(doc):
+    # Titles carry the state name, which the line itself often doesn't
+    return (doc.get('title', '') + '\n' + doc['full_text']).strip()
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _save_npy_atomic(path, array):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+def load_embedding_meta(db_dir):
+    path = os.path.join(db_dir, EMBEDDINGS_META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_embedding_index(database, db_dir, model_name=DEFAULT_EMBEDDING_MODEL, dtype="float32",
+                          batch_size=EMBEDDING_BATCH_SIZE):
+    """Embed every chunk and write the matrix for memory-mapped serving
+
+    Rows of a previous build with the same model are reused for chunks whose text
+    didn't change, so incremental builds only embed new text.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required to build the embedding index")
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Embedding dtype must be one of {', '.join(EMBEDDING_DTYPES)}")
+
+    texts = [embedding_text(doc) for doc in database]
+    hashes = [text_hash(text) for text in texts]
+
+    previous = None
+    previous_rows = {}
+    meta = load_embedding_meta(db_dir)
+    if meta and meta.get('model') == model_name:
+        try:
+            previous = VectorIndex(db_dir, meta)
+            previous_rows = {digest: row for row, digest in enumerate(meta['text_hashes'])}
+        except Exception as e:
+            logger.warning(f"Not reusing previous embeddings: {str(e)}")
+
+    missing = [i for i, digest in enumerate(hashes) if digest not in previous_rows]
+    model = get_embedding_model(model_name) if missing else None
+    if missing and model is None:
+        raise RuntimeError(f"Embedding model {model_name} is not available")
+
+    if model is not None:
+        dimensions = model.get_sentence_embedding_dimension()
+    else:
+        dimensions = previous.dimensions if previous is not None else 0
+    matrix = np.zeros((len(database), dimensions), dtype=np.float32)
+    for i, digest in enumerate(hashes):
+        if digest in previous_rows:
+            matrix[i] = previous.row(previous_rows[digest])
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        matrix[batch] = embed_texts(model, [texts[i] for i in batch], batch_size)
+    logger.info(f"Embedded {len(missing)} chunks, reused {len(database) - len(missing)}")
+
+    if dtype == "int8":
+        quantized, scales = quantize_int8(matrix)
+        _save_npy_atomic(os.path.join(db_dir, EMBEDDINGS_FILE), quantized)
+        _save_npy_atomic(os.path.join(db_dir, EMBEDDING_SCALES_FILE), scales)
+    else:
+        _save_npy_atomic(os.path.join(db_dir, EMBEDDINGS_FILE), matrix)
+        if os.path.exists(os.path.join(db_dir, EMBEDDING_SCALES_FILE)):
+            os.remove(os.path.join(db_dir, EMBEDDING_SCALES_FILE))
+
+    # Written last: the index is only picked up once its metadata is in place
+    tmp_path = os.path.join(db_dir, EMBEDDINGS_META_FILE + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model': model_name,
+            'dtype': dtype,
+            'num_docs': len(database),
+            'dimensions': dimensions,
+            'text_hashes': hashes
+        }, f)
+    os.replace(tmp_path, os.path.join(db_dir, EMBEDDINGS_META_FILE))
+
+def remove_embedding_index(db_dir):
+    for name in (EMBEDDINGS_META_FILE, EMBEDDINGS_FILE, EMBEDDING_SCALES_FILE):
+        if os.path.exists(os.path.join(db_dir, name)):
+            os.remove(os.path.join(db_dir, name))
+
+class VectorIndex:
+    """Memory-mapped chunk embeddings with exact top-k by blocked matrix-vector products"""
+
+    def __init__(self, db_dir, meta=None):
+        if np is None:
+            raise RuntimeError("numpy is required for the embedding index")
+        meta = meta or load_embedding_meta(db_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No embedding index in {db_dir}")
+        self.model_name = meta['model']
+        self.dtype = meta['dtype']
+        self.matrix = np.load(os.path.join(db_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        self.scales = None
+        if self.dtype == "int8":
+            self.scales = np.load(os.path.join(db_dir, EMBEDDING_SCALES_FILE), mmap_mode='r')
+        self.num_docs, self.dimensions = self.matrix.shape
+        if self.num_docs != meta['num_docs']:
+            raise ValueError(f"Embedding index has {self.num_docs} rows, expected {meta['num_docs']}")
+
+    def row(self, i):
+        if self.scales is not None:
+            return self.matrix[i].astype(np.float32) * self.scales[i]
+        return np.asarray(self.matrix[i], dtype=np.float32)
+
+    def embed_queries(self, queries):
+        """Embed queries with the model the index was built with, or None if it can't be loaded"""
+        model = get_embedding_model(self.model_name)
+        if model is None:
+            return None
+        return embed_texts(model, queries)
+
+    def search(self, vector, k):
+        """Return the k most similar (doc_id, cosine similarity) pairs, best first"""
+        if vector is None or not self.num_docs:
+            return []
+        similarities = np.empty(self.num_docs, dtype=np.float32)
+        for start in range(0, self.num_docs, SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS]
+            if self.scales is not None:
+                scores = block.astype(np.float32) @ vector
+                scores *= self.scales[start:start + SEARCH_BLOCK_ROWS]
+            else:
+                scores = block @ vector
+            similarities[start:start + len(block)] = scores
+
+        k = min(k, self.num_docs)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.lexsort((top, -similarities[top]))]
+        return [(int(doc_id), float(similarities[doc_id])) for doc_id in top]